@@ -0,0 +1,1283 @@
+"""
+Cálculos do relatório de horas (planejadas x reais) a partir do CSV exportado.
+
+Este módulo não depende do Streamlit: é usado tanto pela interface
+(`main.py`) quanto pelo modo batch de linha de comando (`cli.py`).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import importlib.util
+import logging
+import multiprocessing
+import os
+import re
+import tempfile
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_hours(raw) -> float:
+    """
+    Converte valores como "08:30", "4", "4:00", "4,75" → horas (float).
+    Valores vazios viram 0.
+    """
+    if pd.isna(raw):
+        return 0.0
+    raw = str(raw).strip()
+    if raw == "":
+        return 0.0
+
+    # Formato HH:MM
+    if re.match(r"^\d+:\d+$", raw):
+        h, m = map(int, raw.split(":"))
+        return h + m / 60
+
+    # Troca vírgula por ponto (ex.: 4,75 → 4.75)
+    raw = raw.replace(",", ".")
+    try:
+        return float(raw)
+    except ValueError:
+        # Extrai o primeiro número que encontrar
+        num = re.search(r"(\d+[\.,]?\d*)", raw)
+        return float(num.group(1).replace(",", ".")) if num else 0.0
+
+
+# Formatos mais comuns, tratados de forma vetorizada em _parse_hours_column
+_HHMM_PATTERN = r"^(\d+):(\d+)$"
+_NUMBER_PATTERN = r"^[+-]?(?:\d+[\.,]?\d*|[\.,]\d+)$"
+
+
+def _parse_unique(values: pd.Series, parse, fill_value) -> pd.Series:
+    """
+    Aplica `parse` apenas aos valores distintos de `values` e espalha o
+    resultado pelas linhas. Exportações grandes repetem poucas horas e datas
+    de sprint, então o custo passa a depender do número de valores únicos.
+    Valores ausentes recebem `fill_value`.
+    """
+    codes, uniques = pd.factorize(values)
+    parsed = parse(pd.Series(uniques, dtype=object))
+    result = pd.api.extensions.take(
+        parsed.to_numpy(), codes, allow_fill=True, fill_value=fill_value
+    )
+    return pd.Series(result, index=values.index)
+
+
+def _parse_hours_column(values: pd.Series) -> pd.Series:
+    """
+    Versão vetorizada de `_parse_hours` para uma coluna inteira.
+    Mantém exatamente a mesma semântica; vazios viram 0.
+    """
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(float).fillna(0.0)
+    return _parse_unique(values, _parse_hours_uniques, 0.0).astype(float)
+
+
+def _parse_sprint_dates(values: pd.Series) -> pd.Series:
+    """Converte as datas "dd/mm/aaaa HH:MM:SS" da sprint; inválidas viram NaT."""
+    return _parse_unique(
+        values,
+        lambda uniques: pd.to_datetime(
+            uniques, format="%d/%m/%Y %H:%M:%S", errors="coerce"
+        ),
+        pd.NaT,
+    ).astype("datetime64[ns]")
+
+
+def _parse_hours_uniques(values: pd.Series) -> pd.Series:
+    """
+    Aplica as regras de `_parse_hours` com operações de string do pandas.
+    "HH:MM" e números simples ("4", "4,75") são convertidos em bloco; apenas
+    valores fora desses formatos caem no parser linha a linha.
+    """
+    hours = pd.Series(0.0, index=values.index)
+    text = values.astype("string").str.strip().fillna("")
+    filled = text != ""
+    if not filled.any():
+        return hours
+
+    # Formato HH:MM
+    hhmm = text.str.extract(_HHMM_PATTERN)
+    is_hhmm = hhmm[0].notna()
+    if is_hhmm.any():
+        hours[is_hhmm] = (
+            hhmm.loc[is_hhmm, 0].astype(float) + hhmm.loc[is_hhmm, 1].astype(float) / 60
+        )
+
+    # Números com ponto ou vírgula decimal
+    is_number = text.str.match(_NUMBER_PATTERN).astype(bool) & ~is_hhmm
+    if is_number.any():
+        hours[is_number] = (
+            text[is_number].str.replace(",", ".", regex=False).astype(float)
+        )
+
+    # Demais formatos (texto com números embutidos etc.)
+    other = filled & ~is_hhmm & ~is_number
+    if other.any():
+        hours[other] = text[other].astype(object).map(_parse_hours)
+
+    return hours
+
+
+def summarize_hours(tasks, chunksize=None) -> pd.DataFrame:
+    """
+    Devolve um DataFrame com o total de horas por usuário.
+    Aceita o DataFrame normalizado de `load_tasks`, `TaskTables`, `TaskCube`
+    ou o próprio arquivo CSV; com `chunksize`, o arquivo é lido em blocos
+    dessa quantidade de linhas, com memória limitada.
+    """
+    if not isinstance(tasks, (pd.DataFrame, TaskTables, TaskCube)):
+        tasks = stream_task_cube(tasks, chunksize) if chunksize else load_tasks(tasks)
+    cells = build_task_cube(tasks).cells
+
+    # Considera apenas tarefas finalizadas
+    done = cells[(cells["num_done"] > 0) & (cells["assigned_to"] != "")]
+
+    # Soma por pessoa
+    resumo = _rollup_cells(
+        done, "assigned_to", ["total_planned_hours", "total_real_hours"]
+    ).sort_values("assigned_to")
+
+    # Calcula a diferença entre horas reais e planejadas
+    resumo["difference"] = resumo["total_real_hours"] - resumo["total_planned_hours"]
+
+    # Calcula a precisão da estimativa (quanto mais próximo de 100%, melhor)
+    resumo["estimation_accuracy"] = (
+        (
+            100
+            - abs(
+                resumo["difference"]
+                / resumo["total_planned_hours"].replace(0, float("nan"))
+                * 100
+            )
+        )
+        .fillna(0)
+        .clip(0, 100)
+    )
+
+    return resumo
+
+
+def get_task_status_summary(df):
+    """Gera um resumo de tarefas por status."""
+    cells = build_task_cube(df).cells
+    status_counts = _rollup_cells(cells[cells["state"] != ""], "state", ["num_rows"])
+    status_counts = (
+        status_counts[status_counts["num_rows"] > 0]
+        .sort_values("num_rows", ascending=False, kind="stable")
+        .reset_index(drop=True)
+    )
+    status_counts.columns = ["Status", "Quantidade"]
+    return status_counts
+
+
+def _summary_by(df, key):
+    """Horas, tarefas e % de conclusão por `key` (epic ou sprint) a partir do cubo."""
+    cells = build_task_cube(df).cells
+    summary = _rollup_cells(
+        cells[cells[key] != ""],
+        key,
+        [
+            "num_tasks",
+            "num_rows",
+            "num_done",
+            "total_planned_hours",
+            "total_real_hours",
+        ],
+    )
+    summary["pct_completed"] = summary["num_done"] / summary["num_rows"] * 100
+    summary["difference"] = summary["total_real_hours"] - summary["total_planned_hours"]
+    return summary[
+        [
+            key,
+            "num_tasks",
+            "total_planned_hours",
+            "total_real_hours",
+            "pct_completed",
+            "difference",
+        ]
+    ]
+
+
+def get_epic_summary(df):
+    """Gera um resumo de horas por epic."""
+    # Epics vazios são descartados na consolidação
+    return _summary_by(df, "story.epic").sort_values("num_tasks", ascending=False)
+
+
+def get_sprint_summary(df):
+    """Gera um resumo de horas por sprint."""
+    return _summary_by(df, "story.sprint").sort_values("story.sprint")
+
+
+def get_daily_workload(df):
+    """Analisa a carga de trabalho ao longo do período da sprint."""
+    if isinstance(df, TaskTables):
+        # Tarefas de uma mesma história compartilham as datas da sprint:
+        # basta distribuir as horas somadas de cada história
+        per_story = df.tasks.groupby("story.number", observed=True)[
+            ["planned_hours", "real_hours"]
+        ].sum()
+        df = per_story.join(df.stories)
+
+    # Verificar se as datas da sprint foram interpretadas na ingestão
+    if "sprint_start_date" not in df.columns or "sprint_end_date" not in df.columns:
+        return None
+
+    try:
+        df = df.rename(
+            columns={"sprint_start_date": "start_date", "sprint_end_date": "end_date"}
+        )
+
+        # Se não conseguiu converter nenhuma data, retorna None
+        if df["start_date"].isna().all() or df["end_date"].isna().all():
+            return None
+
+        # Filtrar registros com datas válidas
+        df_with_dates = df.dropna(subset=["start_date", "end_date"])
+        if len(df_with_dates) == 0:
+            return None
+
+        # Criar um DataFrame com dias entre início e fim da sprint
+        start_date = df_with_dates["start_date"].min()
+        end_date = df_with_dates["end_date"].max()
+
+        date_range = pd.date_range(start=start_date, end=end_date, freq="D")
+
+        # Distribuir horas pelas datas (simplificado - distribuição uniforme).
+        # Cada tarefa soma sua carga diária no primeiro dia e a subtrai no dia
+        # seguinte ao último (array de diferenças); a soma acumulada dá a carga
+        # de cada dia sem percorrer as tarefas uma a uma.
+        one_day = pd.Timedelta(days=1)
+        task_days = (
+            df_with_dates["end_date"] - df_with_dates["start_date"]
+        ) // one_day + 1
+        offset = df_with_dates["start_date"] - start_date
+
+        # Só entram tarefas cujos dias coincidem com o calendário do período
+        valid = (task_days > 0) & (offset % one_day == pd.Timedelta(0))
+        first_day = (offset[valid] // one_day).to_numpy()
+        task_days = task_days[valid].to_numpy()
+
+        n_days = len(date_range)
+        daily_load = pd.DataFrame(index=date_range)
+        for col in ["planned_hours", "real_hours"]:
+            daily_hours = df_with_dates.loc[valid, col].to_numpy() / task_days
+            diff = np.bincount(first_day, weights=daily_hours, minlength=n_days + 1)
+            diff -= np.bincount(
+                first_day + task_days, weights=daily_hours, minlength=n_days + 1
+            )
+            daily_load[col] = np.cumsum(diff)[:n_days]
+
+        daily_load = daily_load.reset_index()
+        daily_load.rename(columns={"index": "date"}, inplace=True)
+        return daily_load
+
+    except Exception:
+        return None
+
+
+def prepare_tasks_data(df, messages=None):
+    """
+    Normaliza o DataFrame lido do CSV: horas em float, textos sem NaN e datas
+    da sprint interpretadas. É a base compartilhada por todas as abas.
+    Com `messages`, os avisos são acrescentados à lista em vez de emitidos.
+    """
+    # Adiciona colunas necessárias
+    df = df.copy()
+    df["planned_hours"] = _parse_hours_column(df["u_horas_planejadas"])
+    df["real_hours"] = _parse_hours_column(df["u_horas_reais"])
+
+    # Calcula a diferença entre horas reais e planejadas
+    df["difference"] = df["real_hours"] - df["planned_hours"]
+
+    # Calcula eficiência (real / planejado)
+    # Evita divisão por zero
+    df["efficiency"] = (
+        df["planned_hours"] / df["real_hours"].replace(0, float("nan"))
+    ).fillna(0)
+    df["efficiency"] = df["efficiency"].clip(0, 2)  # limita entre 0 e 200%
+
+    # Flag para tarefas sem estimativa
+    df["has_estimate"] = df["planned_hours"] > 0
+
+    # Horas em float32 quando a conversão é exata
+    for col in ["planned_hours", "real_hours", "difference"]:
+        df[col] = _compact_float(df[col])
+
+    # Garantir que colunas de texto sejam string e limpar valores NaN
+    text_columns = [
+        "state",
+        "story.epic",
+        "assigned_to",
+        "story.sprint",
+        "short_description",
+        "number",
+        "story.number",
+    ]
+    for col in text_columns:
+        if col in df.columns:
+            df[col] = _compact_text(df[col].fillna("").astype(str))
+
+    # Demais colunas de texto do CSV (horas e datas originais, história etc.)
+    for col in df.select_dtypes(object).columns:
+        df[col] = _compact_text(df[col])
+
+    # Flag de tarefa concluída, usada por todos os resumos (em category o
+    # lower() roda uma vez por status, não por tarefa)
+    df["is_done"] = (df["state"].str.lower() == "concluído").astype(bool)
+
+    # Interpreta datas onde disponíveis
+    if (
+        "story.sprint.start_date" in df.columns
+        and "story.sprint.end_date" in df.columns
+    ):
+        try:
+            df["sprint_start_date"] = _parse_sprint_dates(df["story.sprint.start_date"])
+            df["sprint_end_date"] = _parse_sprint_dates(df["story.sprint.end_date"])
+            df["sprint_duration_days"] = (
+                df["sprint_end_date"] - df["sprint_start_date"]
+            ).dt.days
+        except Exception as e:
+            _warn(f"Erro ao processar os dados da sprint: {e}", messages)
+
+    return df
+
+
+def _warn(message, messages=None):
+    """Emite `message` como aviso ou, com `messages`, acrescenta-a à lista."""
+    if messages is None:
+        warnings.warn(message, stacklevel=3)
+    else:
+        messages.append(message)
+
+
+# Colunas de texto com até essa proporção de valores distintos viram category
+_CATEGORY_MAX_RATIO = 0.5
+
+
+def _compact_text(values: pd.Series) -> pd.Series:
+    """
+    Representação compacta de uma coluna de texto: category quando há poucos
+    valores distintos, string Arrow (se o pyarrow estiver instalado) nos demais
+    casos.
+    """
+    if values.nunique() <= len(values) * _CATEGORY_MAX_RATIO:
+        return values.astype("category")
+    if importlib.util.find_spec("pyarrow") is not None:
+        return values.astype("string[pyarrow]")
+    return values
+
+
+def _compact_float(values: pd.Series) -> pd.Series:
+    """Converte para float32 apenas se nenhum valor perder precisão."""
+    compact = values.astype(np.float32)
+    if np.array_equal(compact.to_numpy(np.float64), values.to_numpy(), equal_nan=True):
+        return compact
+    return values
+
+
+def memory_report(df_tasks) -> pd.DataFrame:
+    """
+    Bytes por coluna do DataFrame de tarefas, comparando a representação
+    compacta com a anterior (textos como objetos Python e horas em float64).
+    De `TaskTables`, lista as colunas das duas tabelas, como ficam em memória.
+    """
+    if isinstance(df_tasks, TaskTables):
+        report = pd.concat(
+            [
+                _column_bytes(df_tasks.tasks),
+                _column_bytes(df_tasks.stories.reset_index()).rename(
+                    lambda col: f"{col} (histórias)"
+                ),
+            ]
+        )
+    else:
+        report = _column_bytes(df_tasks)
+
+    report.loc["TOTAL"] = report.sum()
+    report["reduction_pct"] = (
+        (1 - report["after_bytes"] / report["before_bytes"].replace(0, float("nan")))
+        * 100
+    ).fillna(0)
+    return report.rename_axis("column").reset_index()
+
+
+def _column_bytes(df) -> pd.DataFrame:
+    """Bytes por coluna de `df` na representação anterior e na compacta."""
+    expanded = {}
+    for col in df.columns:
+        values = df[col]
+        if isinstance(values.dtype, (pd.CategoricalDtype, pd.StringDtype)):
+            values = values.astype(object)
+        elif values.dtype == np.float32:
+            values = values.astype(np.float64)
+        expanded[col] = values
+
+    return pd.DataFrame(
+        {
+            "before_bytes": pd.DataFrame(expanded).memory_usage(index=False, deep=True),
+            "after_bytes": df.memory_usage(index=False, deep=True),
+        }
+    )
+
+
+# Colunas da exportação usadas pelo app, na ordem do CSV. São lidas como
+# texto, sem inferência de tipos: horas e datas são interpretadas depois
+CSV_COLUMNS = [
+    "story.epic",
+    "story.sprint",
+    "story.number",
+    "story",
+    "story.state",
+    "number",
+    "short_description",
+    "assigned_to",
+    "state",
+    "u_horas_planejadas",
+    "u_horas_reais",
+    "story.sprint.start_date",
+    "story.sprint.end_date",
+]
+
+CSV_ENGINES = ["pyarrow", "c"]
+
+# Valores lidos como ausentes pelos dois leitores: o conjunto padrão do
+# pandas, declarado aqui para que pyarrow, leitor C e streaming coincidam
+CSV_NA_VALUES = [
+    "",
+    "#N/A",
+    "#N/A N/A",
+    "#NA",
+    "-1.#IND",
+    "-1.#QNAN",
+    "-NaN",
+    "-nan",
+    "1.#IND",
+    "1.#QNAN",
+    "<NA>",
+    "N/A",
+    "NA",
+    "NULL",
+    "NaN",
+    "None",
+    "n/a",
+    "nan",
+    "null",
+]
+
+
+def read_export(csv_file, engine=None) -> tuple[pd.DataFrame, str]:
+    """
+    Lê só as `CSV_COLUMNS` do CSV exportado, todas como texto. Por padrão usa
+    o leitor multithread do pyarrow, quando instalado; se ele falhar (ex.:
+    colunas ausentes), volta ao leitor C do pandas, que tolera colunas
+    faltando. Devolve o DataFrame e o leitor usado.
+    """
+    if engine is None:
+        engine = "pyarrow" if importlib.util.find_spec("pyarrow") else "c"
+    if engine not in CSV_ENGINES:
+        raise ValueError(f"Leitor de CSV desconhecido: {engine}")
+
+    if engine == "pyarrow":
+        start = csv_file.tell() if hasattr(csv_file, "tell") else None
+        try:
+            return _read_export_pyarrow(csv_file), "pyarrow"
+        except Exception:
+            if start is not None:
+                csv_file.seek(start)
+
+    return _read_export_c(csv_file, CSV_COLUMNS), "c"
+
+
+def _read_export_c(csv_file, columns, **kwargs):
+    """
+    Leitura com o leitor C do pandas: só as `columns` presentes, como texto
+    e com os mesmos ausentes do pyarrow. `kwargs` vão para `pd.read_csv`
+    (ex.: `chunksize`).
+    """
+    return pd.read_csv(
+        csv_file,
+        encoding="latin1",
+        usecols=lambda col: col in columns,
+        dtype=str,
+        keep_default_na=False,
+        na_values=CSV_NA_VALUES,
+        **kwargs,
+    )
+
+
+def _read_export_pyarrow(csv_file) -> pd.DataFrame:
+    """Leitura com `pyarrow.csv`, com os tipos declarados em vez de inferidos."""
+    from pyarrow import compute as pa_compute, csv as pa_csv, string
+
+    table = pa_csv.read_csv(
+        str(csv_file) if isinstance(csv_file, Path) else csv_file,
+        read_options=pa_csv.ReadOptions(encoding="latin1"),
+        parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=CSV_COLUMNS,
+            column_types={col: string() for col in CSV_COLUMNS},
+            null_values=CSV_NA_VALUES,
+            strings_can_be_null=True,
+        ),
+    )
+    df = table.to_pandas()
+    # Nulos chegam como None; o leitor C usa NaN
+    for col, values in zip(table.column_names, table.columns):
+        if values.null_count:
+            missing = pa_compute.is_null(values).to_numpy(zero_copy_only=False)
+            df.loc[missing, col] = np.nan
+    return df
+
+
+def load_tasks(csv_file, engine=None, messages=None) -> pd.DataFrame:
+    """
+    Lê o CSV exportado uma única vez e devolve o DataFrame normalizado. O
+    leitor usado e os tempos de leitura e normalização ficam em
+    `df.attrs["ingest"]`; `messages` como em `prepare_tasks_data`.
+    """
+    started = time.perf_counter()
+    df, backend = read_export(csv_file, engine)
+    read_seconds = time.perf_counter() - started
+    df = prepare_tasks_data(df, messages)
+    df.attrs["ingest"] = {
+        "backend": backend,
+        "read_seconds": read_seconds,
+        "prepare_seconds": time.perf_counter() - started - read_seconds,
+    }
+    return df
+
+
+def merge_tasks(frames) -> pd.DataFrame:
+    """
+    Junta DataFrames normalizados de várias exportações em uma única tabela de
+    tarefas, sem repetições: cada `number` fica com a sua última linha (da
+    exportação mais recente, a última em `frames`), inclusive quando se repete
+    dentro de um mesmo arquivo. Tarefas sem `number` são mantidas todas.
+    """
+    frames = list(frames)
+
+    # Upsert pelo número da tarefa: a tabela hash do factorize dá um código
+    # por tarefa e cada código guarda a posição (global) da sua última linha.
+    # Tarefas sem número não têm como ser identificadas e são todas mantidas
+    numbers = np.concatenate([frame["number"].to_numpy(object) for frame in frames])
+    codes, uniques = pd.factorize(numbers)
+    blank = (codes < 0) | (numbers == "")
+    latest = np.full(len(uniques), -1)
+    np.maximum.at(latest, codes[~blank], np.flatnonzero(~blank))
+    keep = blank.copy()
+    keep[latest[latest >= 0]] = True
+    kept = np.flatnonzero(keep)
+
+    # Exportação única e sem repetições: nada a remover
+    if len(frames) == 1 and len(kept) == len(numbers):
+        return frames[0]
+
+    # Só as linhas vencedoras de cada exportação são copiadas
+    bounds = np.cumsum([len(frame) for frame in frames])
+    pieces = [
+        frame.take(rows - start)
+        for frame, start, rows in zip(
+            frames,
+            [0, *bounds[:-1]],
+            np.split(kept, np.searchsorted(kept, bounds[:-1])),
+        )
+    ]
+    merged = pd.concat(pieces, ignore_index=True)
+
+    # Categorias diferentes entre exportações viram object no concat
+    for col in merged.select_dtypes(object).columns:
+        merged[col] = _compact_text(merged[col])
+    return merged
+
+
+# Campos da história repetidos em cada tarefa da exportação
+STORY_COLUMNS = [
+    "story.epic",
+    "story.sprint",
+    "story",
+    "story.state",
+    "story.sprint.start_date",
+    "story.sprint.end_date",
+    "sprint_start_date",
+    "sprint_end_date",
+    "sprint_duration_days",
+]
+
+
+class TaskTables(NamedTuple):
+    """
+    Tarefas normalizadas em esquema estrela: uma tabela de histórias (indexada
+    por story.number) e uma tabela enxuta de tarefas que a referencia.
+    """
+
+    stories: pd.DataFrame
+    tasks: pd.DataFrame
+    columns: list
+
+    def take(self, positions, columns=None) -> pd.DataFrame:
+        """
+        Linhas `positions` (posições em `tasks`) no formato de `load_tasks`,
+        uma por tarefa, apenas com `columns`: os campos da história são
+        buscados só para essas linhas.
+        """
+        columns = [col for col in (columns or self.columns) if col in self.columns]
+        tasks = self.tasks.take(positions)
+        story_columns = [col for col in columns if col in self.stories.columns]
+        story_fields = (
+            self.stories[story_columns]
+            .take(self.stories.index.get_indexer(tasks["story.number"]))
+            .set_axis(tasks.index)
+        )
+        task_columns = [col for col in columns if col in tasks.columns]
+        return pd.concat([tasks[task_columns], story_fields], axis=1)[columns]
+
+
+def split_stories(df_tasks) -> TaskTables:
+    """
+    Separa o DataFrame normalizado em histórias e tarefas ligadas por
+    story.number. Os campos da história são lidos da última tarefa de cada
+    uma: a exportação os repete iguais em todas e, em tarefas combinadas de
+    várias exportações (`merge_tasks`), a última vem da mais recente.
+    """
+    story_columns = [col for col in STORY_COLUMNS if col in df_tasks.columns]
+    stories = (
+        df_tasks[["story.number", *story_columns]]
+        .drop_duplicates("story.number", keep="last")
+        .set_index("story.number")
+    )
+    tasks = df_tasks.drop(columns=story_columns)
+    return TaskTables(stories, tasks, list(df_tasks.columns))
+
+
+# Dimensões do cubo de agregados (menor grão dos resumos e filtros)
+CUBE_DIMENSIONS = ["assigned_to", "story.epic", "story.sprint", "state"]
+
+# Medidas somáveis de cada célula do cubo
+CUBE_MEASURES = [
+    "num_tasks",
+    "num_rows",
+    "num_done",
+    "num_missing_estimate",
+    "total_planned_hours",
+    "total_real_hours",
+]
+
+
+class TaskCube(NamedTuple):
+    """
+    Contagens e somas de horas por pessoa × epic × sprint × status, calculadas
+    em uma única passada pelas tarefas. Os resumos e os filtros do explorador
+    somam células do cubo em vez de percorrer as tarefas de novo.
+    """
+
+    cells: pd.DataFrame
+
+    def rollup(self, by=None, filters=None):
+        """
+        Soma as células que atendem `filters` ({dimensão: valor}). Sem `by`,
+        devolve os totais (Series); com `by`, um DataFrame por valor de `by`.
+        """
+        cells = self.cells
+        for dimension, value in (filters or {}).items():
+            cells = cells[cells[dimension] == value]
+        if by is None:
+            return cells[CUBE_MEASURES].sum()
+        return _rollup_cells(cells, by, CUBE_MEASURES)
+
+
+def _rollup_cells(cells, by, measures) -> pd.DataFrame:
+    """Agrega `measures` das células do cubo por `by`."""
+    return cells.groupby(by, as_index=False, observed=True)[measures].sum()
+
+
+def build_task_cube(tasks) -> TaskCube:
+    """
+    Monta o cubo de agregados a partir do DataFrame normalizado ou de
+    `TaskTables` (um cubo já pronto é devolvido como está).
+    """
+    if isinstance(tasks, TaskCube):
+        return tasks
+    if isinstance(tasks, TaskTables):
+        df = tasks.tasks
+        positions = tasks.stories.index.get_indexer(df["story.number"])
+        story_fields = (
+            tasks.stories[["story.epic", "story.sprint"]]
+            .take(positions)
+            .set_axis(df.index)
+        )
+    else:
+        df = tasks
+        story_fields = df[["story.epic", "story.sprint"]]
+
+    frame = pd.concat(
+        [
+            df[["assigned_to", "state", "number", "is_done"]],
+            story_fields,
+            pd.DataFrame(
+                {
+                    # Tarefas sem número no CSV (preenchido com "") não
+                    # entram na contagem de tarefas, só na de linhas
+                    "has_number": (df["number"] != "").astype(bool),
+                    "missing_estimate": df["planned_hours"] == 0,
+                    # Somas em float64, mesmo com as horas em float32
+                    "planned_hours": df["planned_hours"].astype(float),
+                    "real_hours": df["real_hours"].astype(float),
+                },
+                index=df.index,
+            ),
+        ],
+        axis=1,
+    )
+    cells = (
+        frame.groupby(CUBE_DIMENSIONS, observed=True)
+        .agg(
+            num_tasks=("has_number", "sum"),
+            num_rows=("number", "size"),
+            num_done=("is_done", "sum"),
+            num_missing_estimate=("missing_estimate", "sum"),
+            total_planned_hours=("planned_hours", "sum"),
+            total_real_hours=("real_hours", "sum"),
+        )
+        .reset_index()
+    )
+    # Medidas em dtypes numpy (o size de colunas string Arrow sai como Int64,
+    # que contaminaria os percentuais dos resumos)
+    cells = cells.astype(
+        {
+            measure: np.float64 if measure.startswith("total_") else np.int64
+            for measure in CUBE_MEASURES
+        }
+    )
+    return TaskCube(cells[CUBE_DIMENSIONS + CUBE_MEASURES])
+
+
+# Colunas do CSV necessárias para o cubo de agregados
+_CUBE_SOURCE_COLUMNS = [
+    "number",
+    "assigned_to",
+    "state",
+    "story.epic",
+    "story.sprint",
+    "u_horas_planejadas",
+    "u_horas_reais",
+]
+
+# Linhas por bloco na leitura em streaming
+STREAM_CHUNK_ROWS = 100_000
+
+
+def stream_task_cube(csv_file, chunksize=STREAM_CHUNK_ROWS) -> TaskCube:
+    """
+    Monta o cubo de agregados lendo o CSV em blocos de `chunksize` linhas,
+    para exportações maiores que a memória: cada bloco é normalizado,
+    agregado e descartado, e só as células do cubo (uma por combinação de
+    pessoa, epic, sprint e status) ficam em memória. Usa o leitor C (o do
+    pyarrow não lê em blocos de linhas); o leitor e os tempos de leitura e
+    de normalização e agregação ficam em `cube.cells.attrs["ingest"]`.
+    """
+    cells = None
+    read_seconds = 0.0
+    prepare_seconds = 0.0
+    started = time.perf_counter()
+    with _read_export_c(csv_file, _CUBE_SOURCE_COLUMNS, chunksize=chunksize) as reader:
+        for chunk in reader:
+            chunk_started = time.perf_counter()
+            read_seconds += chunk_started - started
+            chunk_cells = build_task_cube(prepare_tasks_data(chunk)).cells
+            # Categorias variam entre blocos: as dimensões viram texto simples
+            chunk_cells = chunk_cells.astype(
+                {dimension: object for dimension in CUBE_DIMENSIONS}
+            )
+            if cells is not None:
+                chunk_cells = pd.concat([cells, chunk_cells], ignore_index=True)
+            cells = chunk_cells.groupby(CUBE_DIMENSIONS, as_index=False)[
+                CUBE_MEASURES
+            ].sum()
+            started = time.perf_counter()
+            prepare_seconds += started - chunk_started
+    read_seconds += time.perf_counter() - started
+
+    if cells is None:
+        cells = pd.DataFrame(columns=CUBE_DIMENSIONS + CUBE_MEASURES)
+    cells.attrs["ingest"] = {
+        "backend": "c",
+        "read_seconds": read_seconds,
+        "prepare_seconds": prepare_seconds,
+    }
+    return TaskCube(cells)
+
+
+# Dimensões filtráveis no explorador de tarefas
+FILTER_DIMENSIONS = ["state", "story.epic", "assigned_to", "story.sprint"]
+
+
+class FilterIndex(NamedTuple):
+    """
+    Índice do explorador de tarefas, montado uma vez por arquivo: posições das
+    linhas de cada valor das dimensões filtráveis, opções já ordenadas e as
+    horas planejadas para o filtro por intervalo.
+    """
+
+    positions: dict
+    options: dict
+    planned_hours: np.ndarray
+
+    def select(self, filters=None, planned_range=None) -> np.ndarray:
+        """
+        Posições (ordenadas) das linhas que atendem `filters` ({dimensão:
+        valor}) e `planned_range` (mínimo, máximo), sem copiar o DataFrame.
+        """
+        rows = None
+        for dimension, value in (filters or {}).items():
+            matches = self.positions[dimension].get(value, np.empty(0, np.intp))
+            rows = (
+                matches
+                if rows is None
+                else np.intersect1d(rows, matches, assume_unique=True)
+            )
+
+        if rows is None:
+            rows = np.arange(len(self.planned_hours))
+        if planned_range is not None:
+            planned = self.planned_hours[rows]
+            rows = rows[(planned >= planned_range[0]) & (planned <= planned_range[1])]
+        return rows
+
+
+def build_filter_index(df_tasks) -> FilterIndex:
+    """
+    Monta o `FilterIndex` do DataFrame normalizado ou de `TaskTables` (as
+    posições são as mesmas nos dois: uma linha por tarefa).
+    """
+    if isinstance(df_tasks, TaskTables):
+        df_tasks = df_tasks.take(
+            np.arange(len(df_tasks.tasks)), [*FILTER_DIMENSIONS, "planned_hours"]
+        )
+
+    positions = {}
+    options = {}
+    for dimension in FILTER_DIMENSIONS:
+        codes, uniques = pd.factorize(df_tasks[dimension])
+        # Ordenar as linhas pelo código agrupa as posições de cada valor
+        order = np.argsort(codes, kind="stable")
+        bounds = np.cumsum(np.bincount(codes, minlength=len(uniques)))[:-1]
+        positions[dimension] = dict(zip(uniques, np.split(order, bounds)))
+        options[dimension] = sorted(value for value in uniques if value != "")
+
+    return FilterIndex(positions, options, df_tasks["planned_hours"].to_numpy())
+
+
+# Faixas da eficiência (planejado / real) das tarefas concluídas; 0 indica
+# tarefa sem horas reais lançadas
+EFFICIENCY_CATEGORIES = [
+    "Sem estimativa",
+    "Muito abaixo (>200%)",
+    "Abaixo (125-200%)",
+    "Adequada (80-125%)",
+    "Acima (50-80%)",
+    "Muito acima (<50%)",
+]
+_EFFICIENCY_BOUNDS = [0.5, 0.8, 1.25, 2]
+
+
+def categorize_efficiency(efficiency) -> pd.Categorical:
+    """Classifica as eficiências nas faixas de `EFFICIENCY_CATEGORIES`."""
+    efficiency = np.asarray(efficiency)
+    codes = np.searchsorted(_EFFICIENCY_BOUNDS, efficiency, side="right") + 1
+    codes = np.where(efficiency == 0, 0, codes)
+    return pd.Categorical.from_codes(codes, EFFICIENCY_CATEGORIES, ordered=True)
+
+
+class TaskSelection(NamedTuple):
+    """Tarefas de uma combinação de filtros do explorador e suas métricas."""
+
+    rows: np.ndarray
+    completed_rows: np.ndarray
+    task_count: int
+    completed_tasks: int
+    missing_estimates: int
+    efficiency_counts: pd.DataFrame
+
+
+def select_tasks(df_tasks, filter_index, cube, filters, planned_range) -> TaskSelection:
+    """
+    Aplica os filtros do explorador pelo `FilterIndex` e calcula as métricas
+    da seleção. `rows` e `completed_rows` (concluídas com estimativa) são
+    posições em `df_tasks`.
+    """
+    rows = filter_index.select(filters, planned_range)
+    planned = filter_index.planned_hours[rows]
+    is_done = df_tasks["is_done"].to_numpy()[rows]
+
+    # As contagens saem do cubo, exceto quando o intervalo de horas (que não
+    # é dimensão do cubo) exclui alguma tarefa
+    if planned_range[0] <= filter_index.planned_hours.min(
+        initial=np.inf
+    ) and planned_range[1] >= filter_index.planned_hours.max(initial=-np.inf):
+        totals = cube.rollup(filters=filters)
+        task_count = int(totals["num_rows"])
+        completed_tasks = int(totals["num_done"])
+        missing_estimates = int(totals["num_missing_estimate"])
+    else:
+        task_count = len(rows)
+        completed_tasks = int(is_done.sum())
+        missing_estimates = int((planned == 0).sum())
+
+    completed_rows = rows[is_done & (planned > 0)]
+    categories = pd.Series(
+        categorize_efficiency(df_tasks["efficiency"].to_numpy()[completed_rows])
+    )
+    efficiency_counts = categories.value_counts(sort=False)
+    efficiency_counts = efficiency_counts[efficiency_counts > 0].reset_index()
+    efficiency_counts.columns = ["Categoria", "Quantidade"]
+
+    return TaskSelection(
+        rows,
+        completed_rows,
+        task_count,
+        completed_tasks,
+        missing_estimates,
+        efficiency_counts,
+    )
+
+
+# Snapshots Parquet do DataFrame normalizado, um arquivo por conteúdo de CSV.
+# A versão entra no nome do arquivo: mudanças na normalização devem
+# incrementá-la para não reaproveitar snapshots antigos.
+SNAPSHOT_VERSION = 5
+SNAPSHOT_DIR_ENV = "CONFITEC_SNAPSHOT_DIR"
+
+# Limites da pasta de snapshots, aplicados a cada snapshot gravado; podem ser
+# alterados pelas variáveis de ambiente
+SNAPSHOT_MAX_BYTES_ENV = "CONFITEC_SNAPSHOT_MAX_BYTES"
+SNAPSHOT_MAX_BYTES = 1024**3
+SNAPSHOT_MAX_AGE_ENV = "CONFITEC_SNAPSHOT_MAX_AGE_DAYS"
+SNAPSHOT_MAX_AGE_DAYS = 30
+
+
+def snapshot_dir() -> Path:
+    """Pasta dos snapshots (variável CONFITEC_SNAPSHOT_DIR ou ~/.cache)."""
+    default = Path.home() / ".cache" / "confitec-analytics" / "snapshots"
+    return Path(os.environ.get(SNAPSHOT_DIR_ENV, default))
+
+
+def load_tasks_snapshot(
+    content: bytes, digest=None, cache_dir=None, messages=None
+) -> pd.DataFrame:
+    """
+    Como `load_tasks`, mas a partir dos bytes do CSV e reaproveitando um
+    snapshot Parquet do mesmo conteúdo quando existir. O snapshot é lido com
+    memory-map em vez de interpretar o CSV e as horas novamente.
+    Sem pyarrow instalado, apenas lê o CSV.
+    """
+    if importlib.util.find_spec("pyarrow") is None:
+        return load_tasks(BytesIO(content), messages=messages)
+
+    digest = digest or hashlib.sha256(content).hexdigest()
+    cache_dir = Path(cache_dir) if cache_dir is not None else snapshot_dir()
+    path = cache_dir / f"{digest}-v{SNAPSHOT_VERSION}.parquet"
+
+    if path.exists():
+        try:
+            started = time.perf_counter()
+            df = pd.read_parquet(path, engine="pyarrow", memory_map=True)
+            # Colunas string voltam do Parquet com armazenamento Python
+            string_columns = df.select_dtypes("string").columns
+            df = df.astype({col: "string[pyarrow]" for col in string_columns})
+            df.attrs["ingest"] = {
+                "backend": "snapshot",
+                "read_seconds": time.perf_counter() - started,
+                "prepare_seconds": 0.0,
+            }
+        except Exception as e:
+            # Snapshot corrompido ou ilegível: refaz a partir do CSV
+            _warn(f"Ignorando snapshot inválido {path}: {e}", messages)
+        else:
+            # Marca o uso: a limpeza remove primeiro os menos usados
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            return df
+
+    df = load_tasks(BytesIO(content), messages=messages)
+
+    # Grava em arquivo temporário e renomeia, para que outra sessão nunca
+    # leia um snapshot pela metade
+    tmp_path = None
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            dir=cache_dir, suffix=".tmp", delete=False
+        ) as tmp:
+            tmp_path = tmp.name
+            df.to_parquet(tmp, engine="pyarrow")
+        os.replace(tmp_path, path)
+    except Exception as e:
+        _warn(f"Não foi possível gravar o snapshot {path}: {e}", messages)
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    try:
+        sweep_snapshots(cache_dir)
+    except Exception as e:
+        _warn(f"Não foi possível limpar os snapshots em {cache_dir}: {e}", messages)
+
+    return df
+
+
+def sweep_snapshots(cache_dir=None, max_bytes=None, max_age_days=None) -> int:
+    """
+    Limpa a pasta de snapshots: remove os de outras versões, os não usados há
+    mais de `max_age_days` dias (junto com temporários abandonados) e, se a
+    pasta ainda passar de `max_bytes`, os usados há mais tempo. O uso é dado
+    pelo mtime, renovado a cada leitura. Sem os limites, valem as variáveis
+    CONFITEC_SNAPSHOT_MAX_BYTES e CONFITEC_SNAPSHOT_MAX_AGE_DAYS ou os padrões.
+    Devolve o número de arquivos removidos.
+    """
+    cache_dir = Path(cache_dir) if cache_dir is not None else snapshot_dir()
+    if max_bytes is None:
+        max_bytes = int(os.environ.get(SNAPSHOT_MAX_BYTES_ENV, SNAPSHOT_MAX_BYTES))
+    if max_age_days is None:
+        max_age_days = float(
+            os.environ.get(SNAPSHOT_MAX_AGE_ENV, SNAPSHOT_MAX_AGE_DAYS)
+        )
+    if not cache_dir.is_dir():
+        return 0
+
+    oldest = time.time() - max_age_days * 24 * 3600
+    removed = 0
+    snapshots = []
+    for path in cache_dir.iterdir():
+        version = re.fullmatch(r".+-v(\d+)\.parquet", path.name)
+        if version is None and path.suffix != ".tmp":
+            continue
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            # Removido por outra sessão
+            continue
+        current = version is not None and int(version[1]) == SNAPSHOT_VERSION
+        if stat.st_mtime < oldest or (version is not None and not current):
+            path.unlink(missing_ok=True)
+            removed += 1
+        elif current:
+            snapshots.append((stat.st_mtime, stat.st_size, path))
+
+    total_bytes = sum(size for _, size, _ in snapshots)
+    for _, size, path in sorted(snapshots):
+        if total_bytes <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total_bytes -= size
+        removed += 1
+    return removed
+
+
+# Abaixo deste volume total de CSV, interpretar os arquivos em sequência sai
+# mais barato que iniciar o pool de processos
+PARALLEL_MIN_BYTES = 32 * 1024**2
+
+
+def parallel_load(load, arguments, max_workers=None, messages=None) -> list:
+    """
+    Executa `load(*args)` para cada tupla de `arguments` (ex.: `load_tasks`
+    com caminhos de CSV ou `load_tasks_snapshot` com conteúdo e hash) em um
+    pool de processos, um arquivo por tarefa. Devolve os resultados na ordem
+    de `arguments`; avisos emitidos nos processos são repetidos aqui ou, com
+    `messages`, acrescentados à lista (e `load` recebe a mesma lista quando
+    roda neste processo), sem mexer nos filtros globais de avisos.
+    """
+    arguments = [tuple(args) for args in arguments]
+    max_workers = min(len(arguments), max_workers or os.cpu_count() or 1)
+    if max_workers <= 1:
+        if messages is None:
+            return [load(*args) for args in arguments]
+        return [load(*args, messages=messages) for args in arguments]
+
+    # forkserver evita fork() de um processo com threads (o servidor do
+    # Streamlit) e carrega o script principal e este módulo uma única vez,
+    # sem reimportar pandas e Streamlit em cada processo do pool
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(["__main__", __name__])
+    else:
+        context = multiprocessing.get_context("spawn")
+
+    with ProcessPoolExecutor(max_workers, mp_context=context) as pool:
+        outcomes = list(
+            pool.map(_load_recording_warnings, [load] * len(arguments), arguments)
+        )
+
+    for _, load_messages in outcomes:
+        for message in load_messages:
+            _warn(message, messages)
+    return [result for result, _ in outcomes]
+
+
+def _load_recording_warnings(load, args):
+    """
+    Executa `load(*args)` em um processo do pool, guardando os avisos (cada
+    processo roda uma tarefa por vez, então os filtros globais são seguros).
+    """
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        result = load(*args)
+    return result, [str(warning.message) for warning in caught]
+
+
+def validate_and_clean_hours_data(df, show_debug=False):
+    """
+    Valida os dados de horas já convertidos por `prepare_tasks_data`.
+    Identifica possíveis problemas nos formatos de origem.
+    """
+    # Identificar problemas
+    zero_planned = (df["planned_hours"] == 0).sum()
+    zero_real = (df["real_hours"] == 0).sum()
+    total_rows = len(df)
+
+    # Verificar se há valores negativos (não deveria haver)
+    negative_planned = (df["planned_hours"] < 0).sum()
+    negative_real = (df["real_hours"] < 0).sum()
+
+    # Mostrar debug apenas se solicitado ou se há problemas
+    has_issues = (
+        zero_planned > total_rows * 0.3
+        or zero_real > total_rows * 0.3
+        or negative_planned > 0
+        or negative_real > 0
+    )
+
+    # Exemplos e estatísticas vão para o log (INFO com show_debug, DEBUG nos
+    # demais casos), sem misturar texto à saída de quem chama
+    if show_debug or has_issues:
+        logger.log(
+            logging.INFO if show_debug else logging.DEBUG,
+            "Validando dados de horas: exemplos planejadas %s → %s, reais %s → %s; "
+            "%d tarefas, %d (%.1f%%) com 0 horas planejadas, %d (%.1f%%) com 0 "
+            "horas reais",
+            df["u_horas_planejadas"].head(5).tolist(),
+            df["planned_hours"].head(5).tolist(),
+            df["u_horas_reais"].head(5).tolist(),
+            df["real_hours"].head(5).tolist(),
+            total_rows,
+            zero_planned,
+            zero_planned / total_rows * 100,
+            zero_real,
+            zero_real / total_rows * 100,
+        )
+
+    if negative_planned > 0 or negative_real > 0:
+        warnings.warn(
+            f"Valores negativos de horas - Planejadas: {negative_planned}, "
+            f"Reais: {negative_real}"
+        )
+
+    return df
+
+
+def export_to_excel_format(df_tasks, month_ref=None):
+    """
+    Converte os dados para o formato Excel com as colunas especificadas.
+    Remove a lógica de divisão de horas e usa estrutura simplificada.
+    Filtra apenas tarefas concluídas.
+    """
+    # Validar e limpar dados antes do processamento
+    tables = df_tasks if isinstance(df_tasks, TaskTables) else None
+    df = validate_and_clean_hours_data(
+        df_tasks.tasks if tables is not None else df_tasks
+    )
+
+    # Filtrar apenas tarefas concluídas (mesma lógica do relatório de horas);
+    # de `TaskTables`, só essas linhas recebem os campos da história
+    if tables is not None:
+        df_concluidas = tables.take(np.flatnonzero(df["is_done"]))
+    else:
+        df_concluidas = df[df["is_done"]]
+
+    # Contar tarefas com horas reais > 0 para estatísticas
+    tasks_with_real_hours = (df_concluidas["real_hours"] > 0).sum()
+
+    # Formatar horas reais no formato HH:MM:SS
+    real_hours = df_concluidas["real_hours"].astype(float)
+    real_hours = real_hours.where(real_hours > 0, 0)
+    whole_hours = np.trunc(real_hours).astype("int64")
+    minutes = np.trunc((real_hours % 1) * 60).astype("int64")
+    hours_formatted = (
+        whole_hours.astype(str).str.zfill(2)
+        + ":"
+        + minutes.astype(str).str.zfill(2)
+        + ":00"
+    )
+
+    # Mapeamento das colunas do Excel
+    def column(name):
+        if name in df_concluidas.columns:
+            return df_concluidas[name]
+        return pd.Series("", index=df_concluidas.index)
+
+    excel_df = pd.DataFrame(
+        {
+            "Estória": column("story.number"),
+            "Número": column("number"),
+            "Descrição resumida": column("short_description"),
+            "Estado": column("state"),
+            "Atribuído a": column("assigned_to"),
+            "Horas reais": hours_formatted,
+            "Sprint conclusão": column("story.sprint"),
+        }
+    )
+
+    # Ordenar por Sprint, Estória e Número (valores vazios ao final, como os
+    # NaN do CSV original)
+    excel_df = excel_df.sort_values(
+        ["Sprint conclusão", "Estória", "Número"],
+        key=lambda col: col.astype(object).where(col != ""),
+    ).reset_index(drop=True)
+
+    return excel_df, tasks_with_real_hours, len(df_concluidas)
+
+
+def build_excel_file(excel_df) -> bytes:
+    """
+    Gera o arquivo .xlsx com a aba "Tarefas Concluídas".
+    Usa o modo write-only do openpyxl, que grava as linhas em streaming em vez
+    de manter toda a planilha em memória.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Border, Font, Side
+
+    workbook = Workbook(write_only=True)
+    # Aba com dados detalhados
+    sheet = workbook.create_sheet("Tarefas Concluídas")
+
+    # Cabeçalho no mesmo estilo gerado pelo DataFrame.to_excel
+    thin = Side(style="thin")
+    header = []
+    for name in excel_df.columns:
+        cell = WriteOnlyCell(sheet, value=name)
+        cell.font = Font(bold=True)
+        cell.border = Border(left=thin, right=thin, top=thin, bottom=thin)
+        cell.alignment = Alignment(horizontal="center", vertical="top")
+        header.append(cell)
+    sheet.append(header)
+
+    for row in excel_df.itertuples(index=False, name=None):
+        sheet.append(row)
+
+    excel_buffer = BytesIO()
+    workbook.save(excel_buffer)
+    return excel_buffer.getvalue()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Compara o resumo por epic com lambda por grupo (versão antiga) e com a flag
+`is_done` pré-calculada, em dados sintéticos com muitos epics.
+Uso:
+    python benchmarks/summaries.py --tasks 200000 --groups 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from analytics import (  # noqa: E402
+    build_task_cube,
+    get_epic_summary,
+    prepare_tasks_data,
+)
+
+
+def synthetic_export(n_tasks: int, n_groups: int, seed=0) -> pd.DataFrame:
+    """CSV exportado sintético: cada história pertence a um único epic."""
+    rng = np.random.default_rng(seed)
+    story = rng.integers(0, n_groups * 3, n_tasks)
+    hours = rng.integers(0, 9, (2, n_tasks))
+    minutes = rng.choice([0, 15, 30, 45], (2, n_tasks))
+    return pd.DataFrame(
+        {
+            "number": [f"SCTASK{i:07d}" for i in range(n_tasks)],
+            "story.number": [f"STRY{s:07d}" for s in story],
+            "story.epic": [f"Epic {s % n_groups}" for s in story],
+            "story.sprint": [f"Sprint {s % 26}" for s in story],
+            "assigned_to": [f"Pessoa {i}" for i in rng.integers(0, 40, n_tasks)],
+            "state": rng.choice(["Concluído", "Em andamento", "Cancelada"], n_tasks),
+            "short_description": "Tarefa",
+            "u_horas_planejadas": [
+                f"{h:02d}:{m:02d}" for h, m in zip(hours[0], minutes[0])
+            ],
+            "u_horas_reais": [f"{h:02d}:{m:02d}" for h, m in zip(hours[1], minutes[1])],
+        }
+    )
+
+
+def epic_summary_lambda(df):
+    """Resumo por epic como era antes: % de conclusão calculado em Python."""
+    return (
+        df[df["story.epic"] != ""]
+        .groupby("story.epic", as_index=False, observed=True)
+        .agg(
+            num_tasks=("number", "count"),
+            total_planned_hours=("planned_hours", "sum"),
+            total_real_hours=("real_hours", "sum"),
+            pct_completed=(
+                "state",
+                lambda x: (x.str.lower() == "concluído").mean() * 100,
+            ),
+        )
+    )
+
+
+def epic_summary_is_done(df):
+    """Mesmo resumo só com agregações nativas sobre a flag `is_done`."""
+    summary = (
+        df[df["story.epic"] != ""]
+        .groupby("story.epic", as_index=False, observed=True)
+        .agg(
+            num_tasks=("number", "count"),
+            total_planned_hours=("planned_hours", "sum"),
+            total_real_hours=("real_hours", "sum"),
+            pct_completed=("is_done", "mean"),
+        )
+    )
+    summary["pct_completed"] *= 100
+    return summary
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tasks", type=int, default=200_000)
+    parser.add_argument("--groups", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    df_tasks = prepare_tasks_data(synthetic_export(args.tasks, args.groups))
+    cube = build_task_cube(df_tasks)
+    print(
+        f"{len(df_tasks)} tarefas, {df_tasks['story.epic'].nunique()} epics, "
+        f"{len(cube.cells)} células no cubo"
+    )
+
+    # As duas versões precisam dar o mesmo resultado
+    pd.testing.assert_frame_equal(
+        epic_summary_lambda(df_tasks), epic_summary_is_done(df_tasks)
+    )
+
+    cases = {
+        "lambda por grupo": lambda: epic_summary_lambda(df_tasks),
+        "is_done (agregação nativa)": lambda: epic_summary_is_done(df_tasks),
+        "cubo pronto": lambda: get_epic_summary(cube),
+        "cubo + montagem": lambda: get_epic_summary(build_task_cube(df_tasks)),
+    }
+    baseline = None
+    for name, case in cases.items():
+        best = min(timeit.repeat(case, number=1, repeat=args.repeat))
+        baseline = baseline or best
+        print(f"{name:<28} {best * 1000:9.1f} ms  {baseline / best:6.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
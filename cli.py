@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Gera os relatórios de horas em lote, sem a interface Streamlit.
+Uso:
+    python cli.py export_maio.csv export_junho.csv --output-dir relatorios
+
+Para cada CSV é criada uma pasta com o resumo por usuário, os resumos por
+epic e por sprint e o Excel de tarefas concluídas. Com --merge, os CSVs são
+combinados (tarefas repetidas ficam com o último arquivo) em uma única pasta.
+Com --stream, cada CSV é lido em blocos, com memória limitada, e apenas os
+resumos são gerados (o Excel lista as tarefas e exige o arquivo inteiro).
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+from analytics import (
+    CSV_ENGINES,
+    PARALLEL_MIN_BYTES,
+    STREAM_CHUNK_ROWS,
+    build_excel_file,
+    build_task_cube,
+    export_to_excel_format,
+    get_epic_summary,
+    get_sprint_summary,
+    load_tasks,
+    memory_report,
+    merge_tasks,
+    parallel_load,
+    split_stories,
+    stream_task_cube,
+    summarize_hours,
+)
+
+
+def write_reports(
+    csv_path: Path, output_dir: Path, show_memory=False, engine=None
+) -> Path:
+    """Gera os relatórios de um CSV em `output_dir/<nome do arquivo>`."""
+    df_tasks = load_tasks(csv_path, engine)
+    _print_ingest(csv_path, df_tasks)
+    return _write_report_files(
+        df_tasks, str(csv_path), output_dir / csv_path.stem, show_memory
+    )
+
+
+def write_merged_reports(
+    csv_paths, output_dir: Path, name="consolidado", show_memory=False, engine=None
+) -> Path:
+    """
+    Gera os relatórios dos CSVs combinados em `output_dir/<name>`; para tarefas
+    repetidas vale a linha do último arquivo.
+    """
+    # Os arquivos são interpretados em paralelo, um processo por arquivo, se o
+    # volume compensar o custo de iniciar o pool
+    total_bytes = sum(Path(csv_path).stat().st_size for csv_path in csv_paths)
+    frames = parallel_load(
+        load_tasks,
+        [(csv_path, engine) for csv_path in csv_paths],
+        max_workers=None if total_bytes >= PARALLEL_MIN_BYTES else 1,
+    )
+    for csv_path, frame in zip(csv_paths, frames):
+        _print_ingest(csv_path, frame)
+    df_tasks = merge_tasks(frames)
+    return _write_report_files(df_tasks, name, output_dir / name, show_memory)
+
+
+def write_streamed_reports(
+    csv_path: Path, output_dir: Path, chunksize=STREAM_CHUNK_ROWS
+) -> Path:
+    """
+    Gera os resumos de um CSV lido em blocos de `chunksize` linhas, sem
+    carregá-lo inteiro: relatório por usuário e resumos por epic e por sprint.
+    """
+    cube = stream_task_cube(csv_path, chunksize)
+    _print_ingest(csv_path, cube.cells)
+    report_dir = output_dir / csv_path.stem
+    report_dir.mkdir(parents=True, exist_ok=True)
+    summarize_hours(cube).to_csv(report_dir / "relatorio_horas.csv", index=False)
+    get_epic_summary(cube).to_csv(report_dir / "resumo_epics.csv", index=False)
+    get_sprint_summary(cube).to_csv(report_dir / "resumo_sprints.csv", index=False)
+    return report_dir
+
+
+def _print_ingest(source, df):
+    """Mostra o leitor de CSV usado e os tempos de leitura e normalização."""
+    ingest = df.attrs.get("ingest")
+    if ingest:
+        print(
+            f"Leitura de {source}: {ingest['backend']}, "
+            f"{ingest['read_seconds']:.2f}s "
+            f"(+{ingest['prepare_seconds']:.2f}s de normalização)"
+        )
+
+
+def _write_report_files(df_tasks, source, report_dir: Path, show_memory) -> Path:
+    """Grava os relatórios do DataFrame normalizado em `report_dir`."""
+    if show_memory:
+        print(f"Uso de memória de {source}:")
+        print(memory_report(df_tasks).to_string(index=False))
+
+    report_dir.mkdir(parents=True, exist_ok=True)
+
+    cube = build_task_cube(split_stories(df_tasks))
+    summarize_hours(cube).to_csv(report_dir / "relatorio_horas.csv", index=False)
+    get_epic_summary(cube).to_csv(report_dir / "resumo_epics.csv", index=False)
+    get_sprint_summary(cube).to_csv(report_dir / "resumo_sprints.csv", index=False)
+
+    excel_df, _, _ = export_to_excel_format(df_tasks)
+    (report_dir / "tarefas_concluidas.xlsx").write_bytes(build_excel_file(excel_df))
+
+    return report_dir
+
+
+def main(argv=None) -> int:
+    """Ponto de entrada da linha de comando."""
+    parser = argparse.ArgumentParser(
+        description="Gera os relatórios de horas a partir de CSVs exportados."
+    )
+    parser.add_argument("csv_files", nargs="+", type=Path, help="Arquivos CSV")
+    parser.add_argument(
+        "-o",
+        "--output-dir",
+        type=Path,
+        default=Path("relatorios"),
+        help="Pasta de saída (padrão: relatorios)",
+    )
+    parser.add_argument(
+        "--memory-report",
+        action="store_true",
+        help="Mostra os bytes por coluna dos dados carregados",
+    )
+    parser.add_argument(
+        "--merge",
+        action="store_true",
+        help="Combina os CSVs (na ordem dada) em um único relatório",
+    )
+    parser.add_argument(
+        "--stream",
+        nargs="?",
+        type=int,
+        const=STREAM_CHUNK_ROWS,
+        metavar="LINHAS",
+        help=(
+            "Lê cada CSV em blocos de LINHAS linhas (padrão: "
+            f"{STREAM_CHUNK_ROWS}) e gera apenas os resumos, sem o Excel"
+        ),
+    )
+    parser.add_argument(
+        "--csv-engine",
+        choices=CSV_ENGINES,
+        help="Leitor de CSV (padrão: pyarrow, se instalado; senão c)",
+    )
+    args = parser.parse_args(argv)
+    if args.stream is not None:
+        if args.stream <= 0:
+            parser.error("--stream exige um número de linhas maior que zero")
+        if args.merge or args.memory_report:
+            parser.error("--stream não pode ser usado com --merge ou --memory-report")
+
+    if args.merge:
+        try:
+            report_dir = write_merged_reports(
+                args.csv_files,
+                args.output_dir,
+                show_memory=args.memory_report,
+                engine=args.csv_engine,
+            )
+        except Exception as e:
+            print(f"Erro ao combinar os arquivos: {e}", file=sys.stderr)
+            return 1
+        print(f"{len(args.csv_files)} arquivos → {report_dir}")
+        return 0
+
+    failures = 0
+    for csv_path in args.csv_files:
+        try:
+            if args.stream is not None:
+                report_dir = write_streamed_reports(
+                    csv_path, args.output_dir, args.stream
+                )
+            else:
+                report_dir = write_reports(
+                    csv_path, args.output_dir, args.memory_report, args.csv_engine
+                )
+        except Exception as e:
+            print(f"Erro ao processar {csv_path}: {e}", file=sys.stderr)
+            failures += 1
+        else:
+            print(f"{csv_path} → {report_dir}")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,1132 +10,916 @@ O aplicativo permite fazer upload do arquivo CSV e visualiza o relatório de hor
 from __future__ import annotations
 
 import datetime
-import re
+import hashlib
 
+import numpy as np
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 import streamlit as st
 
-
-def _parse_hours(raw) -> float:
+from analytics import (
+    PARALLEL_MIN_BYTES,
+    build_excel_file,
+    build_filter_index,
+    build_task_cube,
+    export_to_excel_format,
+    get_daily_workload,
+    get_epic_summary,
+    get_sprint_summary,
+    get_task_status_summary,
+    load_tasks_snapshot,
+    TaskTables,
+    memory_report,
+    merge_tasks,
+    parallel_load,
+    select_tasks,
+    split_stories,
+    summarize_hours,
+)
+
+# Cache entre reruns do Streamlit, chaveado pelo hash do conteúdo do arquivo
+CACHE_TTL_SECONDS = 60 * 60
+CACHE_MAX_ENTRIES = 16
+
+# Combinações de filtros recentes do explorador mantidas em cache (LRU)
+EXPLORER_CACHE_ENTRIES = 32
+
+# Linhas por página na lista de tarefas do explorador
+TASK_PAGE_SIZE = 100
+
+# Colunas da lista de tarefas e seus rótulos
+TASK_LIST_COLUMNS = {
+    "number": "Número",
+    "short_description": "Descrição",
+    "story.sprint": "Sprint",
+    "story.epic": "Epic",
+    "assigned_to": "Responsável",
+    "state": "Status",
+    "planned_hours": "Horas Planejadas",
+    "real_hours": "Horas Reais",
+    "difference": "Diferença",
+}
+
+# Relatórios derivados do DataFrame de tarefas, calculados uma vez por arquivo
+_REPORTS = {
+    "cube": build_task_cube,
+    "hours": summarize_hours,
+    "status": get_task_status_summary,
+    "epic": get_epic_summary,
+    "sprint": get_sprint_summary,
+    "daily_workload": get_daily_workload,
+    "filter_index": build_filter_index,
+    "excel": export_to_excel_format,
+    "memory": memory_report,
+}
+
+
+def _file_digest(uploaded_file) -> str:
+    """Hash SHA-256 do conteúdo enviado, calculado uma vez por upload."""
+    digests = st.session_state.setdefault("_file_digests", {})
+    if uploaded_file.file_id not in digests:
+        digests[uploaded_file.file_id] = hashlib.sha256(
+            uploaded_file.getvalue()
+        ).hexdigest()
+    return digests[uploaded_file.file_id]
+
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def _cached_tasks(digest: str, _files: list) -> tuple[TaskTables, list]:
     """
-    Converte valores como "08:30", "4", "4:00", "4,75" → horas (float).
-    Valores vazios viram 0.
+    Lê e normaliza os CSVs uma vez por conjunto de conteúdos (`digest` é a
+    chave) e junta as tarefas. `_files` traz pares (hash, conteúdo) na ordem
+    de envio; tarefas repetidas ficam com a linha do último arquivo. Devolve
+    também, por arquivo, o leitor usado e os tempos da carga.
     """
-    if pd.isna(raw):
-        return 0.0
-    raw = str(raw).strip()
-    if raw == "":
-        return 0.0
-
-    # Formato HH:MM
-    if re.match(r"^\d+:\d+$", raw):
-        h, m = map(int, raw.split(":"))
-        return h + m / 60
-
-    # Troca vírgula por ponto (ex.: 4,75 → 4.75)
-    raw = raw.replace(",", ".")
-    try:
-        return float(raw)
-    except ValueError:
-        # Extrai o primeiro número que encontrar
-        num = re.search(r"(\d+[\.,]?\d*)", raw)
-        return float(num.group(1).replace(",", ".")) if num else 0.0
-
-
-def summarize_hours(csv_file) -> pd.DataFrame:
-    """Lê o CSV e devolve um DataFrame com o total de horas por usuário."""
-    df = pd.read_csv(csv_file, encoding="latin1")
-
-    # Converte texto → números
-    df["planned_hours"] = df["u_horas_planejadas"].apply(_parse_hours)
-    df["real_hours"] = df["u_horas_reais"].apply(_parse_hours)
-
-    # Considera apenas tarefas finalizadas
-    done = df[df["state"].str.lower() == "concluído"]
-
-    # Soma por pessoa
-    resumo = (
-        done.groupby("assigned_to", as_index=False)
-        .agg(
-            total_planned_hours=("planned_hours", "sum"),
-            total_real_hours=("real_hours", "sum"),
-        )
-        .sort_values("assigned_to")
+    # Cada arquivo é interpretado em um processo separado, se o volume
+    # compensar o custo de iniciar o pool
+    messages = []
+    total_bytes = sum(len(content) for _, content in _files)
+    frames = parallel_load(
+        load_tasks_snapshot,
+        [(content, file_digest) for file_digest, content in _files],
+        max_workers=None if total_bytes >= PARALLEL_MIN_BYTES else 1,
+        messages=messages,
     )
 
-    # Calcula a diferença entre horas reais e planejadas
-    resumo["difference"] = resumo["total_real_hours"] - resumo["total_planned_hours"]
-
-    # Calcula a precisão da estimativa (quanto mais próximo de 100%, melhor)
-    resumo["estimation_accuracy"] = (
-        (
-            100
-            - abs(
-                resumo["difference"]
-                / resumo["total_planned_hours"].replace(0, float("nan"))
-                * 100
-            )
-        )
-        .fillna(0)
-        .clip(0, 100)
-    )
+    # Avisos do módulo de cálculo são exibidos na interface (e repetidos pelo
+    # cache do Streamlit nas execuções seguintes)
+    for message in messages:
+        st.error(message)
+    ingest = [frame.attrs.get("ingest", {}) for frame in frames]
+    return split_stories(merge_tasks(frames)), ingest
+
+
+@st.cache_data(
+    ttl=CACHE_TTL_SECONDS,
+    max_entries=CACHE_MAX_ENTRIES * len(_REPORTS),
+    show_spinner=False,
+)
+def _cached_report(digest: str, name: str, _tasks):
+    """Calcula o relatório `name` uma vez por conteúdo do arquivo."""
+    return _REPORTS[name](_tasks)
+
+
+@st.cache_data(
+    ttl=CACHE_TTL_SECONDS, max_entries=EXPLORER_CACHE_ENTRIES, show_spinner=False
+)
+def _cached_selection(
+    digest: str, filters_key: tuple, planned_range: tuple, _df_tasks, _index, _cube
+):
+    """
+    Seleção e métricas do explorador por arquivo e combinação de filtros; voltar
+    a uma combinação recente não refaz os cálculos.
+    """
+    return select_tasks(_df_tasks, _index, _cube, dict(filters_key), planned_range)
+
 
-    return resumo
+@st.cache_data(ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def _cached_payload(digest: str, key: tuple, _build) -> bytes:
+    """Conteúdo de um download, gerado uma vez por arquivo e `key`."""
+    return _build()
 
 
-def get_task_status_summary(df):
-    """Gera um resumo de tarefas por status."""
-    status_counts = df["state"].value_counts().reset_index()
-    status_counts.columns = ["Status", "Quantidade"]
-    return status_counts
+def _lazy_download(
+    digest, key, build, generate_label, use_container_width=False, **download_args
+):
+    """
+    Botão de download cujo conteúdo só é gerado quando solicitado: primeiro
+    aparece o botão `generate_label`; depois, o download servido do cache por
+    arquivo e `key` (ex.: nome do relatório e filtros aplicados).
+    """
+    requested = st.session_state.setdefault("_downloads_requested", set())
+    generate = st.empty()
+    if (digest, key) not in requested and generate.button(
+        generate_label, use_container_width=use_container_width
+    ):
+        requested.add((digest, key))
+        generate.empty()
+
+    if (digest, key) in requested:
+        with st.spinner("Gerando arquivo..."):
+            data = _cached_payload(digest, key, build)
+        st.download_button(
+            data=data, use_container_width=use_container_width, **download_args
+        )
+
 
+@st.fragment
+def _hours_tab(digest, cube):
+    """Visualização: relatório de horas por usuário."""
+    import plotly.express as px
 
-def get_epic_summary(df):
-    """Gera um resumo de horas por epic."""
-    df["planned_hours"] = df["u_horas_planejadas"].apply(_parse_hours)
-    df["real_hours"] = df["u_horas_reais"].apply(_parse_hours)
+    relatorio = _cached_report(digest, "hours", cube)
 
-    # Remove empty epics
-    df_with_epic = df[df["story.epic"].notna() & (df["story.epic"] != "")]
+    st.subheader("Relatório de Horas (Tarefas Concluídas)")
 
-    epic_summary = (
-        df_with_epic.groupby("story.epic", as_index=False)
-        .agg(
-            num_tasks=("number", "count"),
-            total_planned_hours=("planned_hours", "sum"),
-            total_real_hours=("real_hours", "sum"),
-            pct_completed=(
-                "state",
-                lambda x: (x.str.lower() == "concluído").mean() * 100,
-            ),
-        )
-        .sort_values("num_tasks", ascending=False)
+    # Formatação para exibição
+    df_display = relatorio.copy()
+    df_display["total_planned_hours"] = df_display["total_planned_hours"].map(
+        "{:.2f} h".format
     )
-
-    epic_summary["difference"] = (
-        epic_summary["total_real_hours"] - epic_summary["total_planned_hours"]
+    df_display["total_real_hours"] = df_display["total_real_hours"].map(
+        "{:.2f} h".format
     )
-    return epic_summary
-
-
-def get_sprint_summary(df):
-    """Gera um resumo de horas por sprint."""
-    df["planned_hours"] = df["u_horas_planejadas"].apply(_parse_hours)
-    df["real_hours"] = df["u_horas_reais"].apply(_parse_hours)
-
-    sprint_summary = (
-        df.groupby("story.sprint", as_index=False)
-        .agg(
-            num_tasks=("number", "count"),
-            total_planned_hours=("planned_hours", "sum"),
-            total_real_hours=("real_hours", "sum"),
-            pct_completed=(
-                "state",
-                lambda x: (x.str.lower() == "concluído").mean() * 100,
-            ),
-        )
-        .sort_values("story.sprint")
+    df_display["difference"] = df_display["difference"].map("{:.2f} h".format)
+    df_display["estimation_accuracy"] = df_display["estimation_accuracy"].map(
+        "{:.1f}%".format
     )
 
-    sprint_summary["difference"] = (
-        sprint_summary["total_real_hours"] - sprint_summary["total_planned_hours"]
+    df_display = df_display.rename(
+        columns={
+            "assigned_to": "Usuário",
+            "total_planned_hours": "Horas Planejadas",
+            "total_real_hours": "Horas Reais",
+            "difference": "Diferença (Real - Planejada)",
+            "estimation_accuracy": "Precisão da Estimativa",
+        }
     )
-    return sprint_summary
-
 
-def get_daily_workload(df):
-    """Analisa a carga de trabalho ao longo do período da sprint."""
-    # Verificar se as colunas de data existem e têm dados
-    if (
-        "story.sprint.start_date" not in df.columns
-        or "story.sprint.end_date" not in df.columns
-    ):
-        return None
-
-    # Converter colunas de data para datetime
-    try:
-        df["start_date"] = pd.to_datetime(
-            df["story.sprint.start_date"], format="%d/%m/%Y %H:%M:%S", errors="coerce"
-        )
-        df["end_date"] = pd.to_datetime(
-            df["story.sprint.end_date"], format="%d/%m/%Y %H:%M:%S", errors="coerce"
-        )
+    st.dataframe(df_display, use_container_width=True)
+
+    # Gráfico de barras comparativo
+    st.subheader("Gráfico Comparativo")
+
+    fig = px.bar(
+        relatorio,
+        x="assigned_to",
+        y=["total_planned_hours", "total_real_hours"],
+        barmode="group",
+        labels={
+            "assigned_to": "Usuário",
+            "total_planned_hours": "Horas Planejadas",
+            "total_real_hours": "Horas Reais",
+            "value": "Horas",
+        },
+        title="Comparação entre Horas Planejadas e Reais por Usuário",
+        color_discrete_sequence=["#1f77b4", "#ff7f0e"],
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+    # Gráfico de precisão da estimativa
+    st.subheader("Precisão da Estimativa por Usuário")
+    fig = px.bar(
+        relatorio,
+        x="assigned_to",
+        y="estimation_accuracy",
+        labels={
+            "assigned_to": "Usuário",
+            "estimation_accuracy": "Precisão da Estimativa (%)",
+        },
+        title="Precisão da Estimativa por Usuário",
+        color="estimation_accuracy",
+        color_continuous_scale="RdYlGn",
+        range_color=[0, 100],
+    )
+    st.plotly_chart(fig, use_container_width=True)
 
-        # Se não conseguiu converter nenhuma data, retorna None
-        if df["start_date"].isna().all() or df["end_date"].isna().all():
-            return None
 
-        # Filtrar registros com datas válidas
-        df_with_dates = df.dropna(subset=["start_date", "end_date"])
-        if len(df_with_dates) == 0:
-            return None
+@st.fragment
+def _status_tab(digest, cube):
+    """Visualização: status das tarefas."""
+    import plotly.express as px
 
-        # Criar um DataFrame com dias entre início e fim da sprint
-        start_date = df_with_dates["start_date"].min()
-        end_date = df_with_dates["end_date"].max()
+    st.subheader("Distribuição de Status das Tarefas")
 
-        date_range = pd.date_range(start=start_date, end=end_date, freq="D")
+    # Gerar resumo de status
+    status_summary = _cached_report(digest, "status", cube)
 
-        # Distribuir horas pelas datas (simplificado - distribuição uniforme)
-        daily_load = pd.DataFrame(index=date_range)
-        daily_load["planned_hours"] = 0.0
-        daily_load["real_hours"] = 0.0
+    # Gráfico de pizza para status
+    fig = px.pie(
+        status_summary,
+        values="Quantidade",
+        names="Status",
+        title="Distribuição de Tarefas por Status",
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+    # Tabela de status
+    st.dataframe(status_summary, use_container_width=True)
+
+    # Número de tarefas por usuário
+    st.subheader("Tarefas por Usuário")
+    user_counts = cube.rollup("assigned_to")[["assigned_to", "num_rows"]]
+    tasks_by_user = (
+        user_counts[(user_counts["assigned_to"] != "") & (user_counts["num_rows"] > 0)]
+        .sort_values("num_rows", ascending=False, kind="stable")
+        .reset_index(drop=True)
+    )
+    tasks_by_user.columns = ["Usuário", "Número de Tarefas"]
 
-        # Para cada tarefa, distribua as horas pelos dias da sprint
-        for _, row in df_with_dates.iterrows():
-            task_days = (row["end_date"] - row["start_date"]).days + 1
-            if task_days > 0:
-                daily_planned = _parse_hours(row["u_horas_planejadas"]) / task_days
-                daily_real = _parse_hours(row["u_horas_reais"]) / task_days
+    fig = px.bar(
+        tasks_by_user,
+        x="Usuário",
+        y="Número de Tarefas",
+        title="Quantidade de Tarefas por Usuário",
+    )
+    st.plotly_chart(fig, use_container_width=True)
 
-                task_dates = pd.date_range(
-                    start=row["start_date"], end=row["end_date"], freq="D"
-                )
-                for date in task_dates:
-                    if date in daily_load.index:
-                        daily_load.at[date, "planned_hours"] = (
-                            float(daily_load.at[date, "planned_hours"]) + daily_planned
-                        )
-                        daily_load.at[date, "real_hours"] = (
-                            float(daily_load.at[date, "real_hours"]) + daily_real
-                        )
 
-        daily_load = daily_load.reset_index()
-        daily_load.rename(columns={"index": "date"}, inplace=True)
-        return daily_load
-
-    except Exception:
-        return None
-
-
-def prepare_tasks_data(df):
-    """Prepara os dados para o explorador de tarefas."""
-    # Adiciona colunas necessárias
-    df = df.copy()
-    df["planned_hours"] = df["u_horas_planejadas"].apply(_parse_hours)
-    df["real_hours"] = df["u_horas_reais"].apply(_parse_hours)
-
-    # Calcula a diferença entre horas reais e planejadas
-    df["difference"] = df["real_hours"] - df["planned_hours"]
-
-    # Calcula eficiência (real / planejado)
-    # Evita divisão por zero
-    df["efficiency"] = (
-        df["planned_hours"] / df["real_hours"].replace(0, float("nan"))
-    ).fillna(0)
-    df["efficiency"] = df["efficiency"].clip(0, 2)  # limita entre 0 e 200%
-
-    # Flag para tarefas sem estimativa
-    df["has_estimate"] = df["planned_hours"] > 0
-
-    # Garantir que colunas de texto sejam string e limpar valores NaN
-    text_columns = [
-        "state",
-        "story.epic",
-        "assigned_to",
-        "story.sprint",
-        "short_description",
-        "number",
-        "story.number",
-    ]
-    for col in text_columns:
-        if col in df.columns:
-            df[col] = df[col].fillna("").astype(str)
-
-    # Interpreta datas onde disponíveis
-    if (
-        "story.sprint.start_date" in df.columns
-        and "story.sprint.end_date" in df.columns
-    ):
-        try:
-            df["sprint_start_date"] = pd.to_datetime(
-                df["story.sprint.start_date"],
-                format="%d/%m/%Y %H:%M:%S",
-                errors="coerce",
-            )
-            df["sprint_end_date"] = pd.to_datetime(
-                df["story.sprint.end_date"], format="%d/%m/%Y %H:%M:%S", errors="coerce"
-            )
-            df["sprint_duration_days"] = (
-                df["sprint_end_date"] - df["sprint_start_date"]
-            ).dt.days
-        except Exception as e:
-            st.error(f"Erro ao processar os dados da sprint: {e}")
-            pass
+@st.fragment
+def _epic_tab(digest, cube):
+    """Visualização: análise por epic."""
+    import plotly.express as px
 
-    return df
+    st.subheader("Análise por Epic")
 
+    # Gerar resumo por epic
+    epic_summary = _cached_report(digest, "epic", cube)
 
-def validate_and_clean_hours_data(df, show_debug=False):
-    """
-    Valida e limpa os dados de horas antes do processamento.
-    Garante que os formatos estejam corretos e identifica possíveis problemas.
-    """
-    df_clean = df.copy()
-
-    # Aplicar parsing e verificar resultados
-    df_clean["planned_hours"] = df_clean["u_horas_planejadas"].apply(_parse_hours)
-    df_clean["real_hours"] = df_clean["u_horas_reais"].apply(_parse_hours)
-
-    # Identificar problemas
-    zero_planned = (df_clean["planned_hours"] == 0).sum()
-    zero_real = (df_clean["real_hours"] == 0).sum()
-    total_rows = len(df_clean)
-
-    # Verificar se há valores negativos (não deveria haver)
-    negative_planned = (df_clean["planned_hours"] < 0).sum()
-    negative_real = (df_clean["real_hours"] < 0).sum()
-
-    # Mostrar debug apenas se solicitado ou se há problemas
-    has_issues = (
-        zero_planned > total_rows * 0.3
-        or zero_real > total_rows * 0.3
-        or negative_planned > 0
-        or negative_real > 0
+    # Formatar para exibição
+    epic_display = epic_summary.copy()
+    epic_display["total_planned_hours"] = epic_display["total_planned_hours"].map(
+        "{:.2f} h".format
+    )
+    epic_display["total_real_hours"] = epic_display["total_real_hours"].map(
+        "{:.2f} h".format
+    )
+    epic_display["difference"] = epic_display["difference"].map("{:.2f} h".format)
+    epic_display["pct_completed"] = epic_display["pct_completed"].map("{:.1f}%".format)
+
+    epic_display = epic_display.rename(
+        columns={
+            "story.epic": "Epic",
+            "num_tasks": "Número de Tarefas",
+            "total_planned_hours": "Horas Planejadas",
+            "total_real_hours": "Horas Reais",
+            "difference": "Diferença (Real - Planejada)",
+            "pct_completed": "% Concluído",
+        }
     )
 
-    if show_debug or has_issues:
-        print("🔍 Debug - Validando dados de horas:")
-        print(
-            "Exemplos de horas planejadas (originais):",
-            df_clean["u_horas_planejadas"].head(5).tolist(),
-        )
-        print(
-            "Exemplos de horas reais (originais):",
-            df_clean["u_horas_reais"].head(5).tolist(),
+    st.dataframe(epic_display, use_container_width=True)
+
+    # Gráfico de progresso por epic
+    if not epic_summary.empty:
+        fig = px.bar(
+            epic_summary.sort_values("pct_completed"),
+            x="pct_completed",
+            y="story.epic",
+            orientation="h",
+            labels={"story.epic": "Epic", "pct_completed": "% Concluído"},
+            title="Progresso por Epic (%)",
+            color="pct_completed",
+            color_continuous_scale="Blues",
+            range_color=[0, 100],
         )
-        print(
-            "Exemplos de horas planejadas (convertidas):",
-            df_clean["planned_hours"].head(5).tolist(),
-        )
-        print(
-            "Exemplos de horas reais (convertidas):",
-            df_clean["real_hours"].head(5).tolist(),
+        st.plotly_chart(fig, use_container_width=True)
+
+        # Gráfico de horas por epic
+        fig = px.bar(
+            epic_summary,
+            x="story.epic",
+            y=["total_planned_hours", "total_real_hours"],
+            barmode="group",
+            labels={
+                "story.epic": "Epic",
+                "total_planned_hours": "Horas Planejadas",
+                "total_real_hours": "Horas Reais",
+                "value": "Horas",
+            },
+            title="Horas Planejadas vs. Reais por Epic",
+            color_discrete_sequence=["#1f77b4", "#ff7f0e"],
         )
+        st.plotly_chart(fig, use_container_width=True)
 
-        print(f"📊 Estatísticas:")
-        print(f"  Total de tarefas: {total_rows}")
-        print(
-            f"  Tarefas com 0 horas planejadas: {zero_planned} ({zero_planned/total_rows*100:.1f}%)"
-        )
-        print(
-            f"  Tarefas com 0 horas reais: {zero_real} ({zero_real/total_rows*100:.1f}%)"
-        )
 
-        if negative_planned > 0 or negative_real > 0:
-            print(
-                f"⚠️ Valores negativos encontrados - Planejadas: {negative_planned}, Reais: {negative_real}"
-            )
+@st.fragment
+def _sprint_tab(digest, cube):
+    """Visualização: análise por sprint."""
+    import plotly.express as px
 
-    return df_clean
+    st.subheader("Análise por Sprint")
 
+    # Gerar resumo por sprint
+    sprint_summary = _cached_report(digest, "sprint", cube)
 
-def export_to_excel_format(df_original, month_ref=None):
-    """
-    Converte os dados para o formato Excel com as colunas especificadas.
-    Remove a lógica de divisão de horas e usa estrutura simplificada.
-    Filtra apenas tarefas concluídas.
-    """
-    # Validar e limpar dados antes do processamento
-    df = validate_and_clean_hours_data(df_original)
+    # Formatar para exibição
+    sprint_display = sprint_summary.copy()
+    sprint_display["total_planned_hours"] = sprint_display["total_planned_hours"].map(
+        "{:.2f} h".format
+    )
+    sprint_display["total_real_hours"] = sprint_display["total_real_hours"].map(
+        "{:.2f} h".format
+    )
+    sprint_display["difference"] = sprint_display["difference"].map("{:.2f} h".format)
+    sprint_display["pct_completed"] = sprint_display["pct_completed"].map(
+        "{:.1f}%".format
+    )
 
-    # Filtrar apenas tarefas concluídas (mesma lógica do relatório de horas)
-    df_concluidas = df[df["state"].str.lower() == "concluído"]
+    sprint_display = sprint_display.rename(
+        columns={
+            "story.sprint": "Sprint",
+            "num_tasks": "Número de Tarefas",
+            "total_planned_hours": "Horas Planejadas",
+            "total_real_hours": "Horas Reais",
+            "difference": "Diferença (Real - Planejada)",
+            "pct_completed": "% Concluído",
+        }
+    )
 
-    # Lista para armazenar as linhas do Excel
-    excel_rows = []
+    st.dataframe(sprint_display, use_container_width=True)
+
+    # Gráfico de velocidade da sprint
+    if not sprint_summary.empty:
+        fig = px.line(
+            sprint_summary,
+            x="story.sprint",
+            y=["total_planned_hours", "total_real_hours"],
+            markers=True,
+            labels={
+                "story.sprint": "Sprint",
+                "value": "Horas",
+                "variable": "Tipo",
+            },
+            title="Velocidade da Sprint (Horas Planejadas vs. Reais)",
+        )
+        fig.update_layout(
+            legend=dict(
+                orientation="h",
+                yanchor="bottom",
+                y=1.02,
+                xanchor="right",
+                x=1,
+            )
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+        # Gráfico de % completado por sprint
+        fig = px.bar(
+            sprint_summary,
+            x="story.sprint",
+            y="pct_completed",
+            labels={
+                "story.sprint": "Sprint",
+                "pct_completed": "% Concluído",
+            },
+            title="Percentual de Conclusão por Sprint",
+            color="pct_completed",
+            color_continuous_scale="Greens",
+            range_color=[0, 100],
+        )
+        st.plotly_chart(fig, use_container_width=True)
 
-    # Contar tarefas com horas reais > 0 para estatísticas
-    tasks_with_real_hours = (df_concluidas["real_hours"] > 0).sum()
 
-    for _, row in df_concluidas.iterrows():
-        # Formatar horas reais no formato HH:MM:SS
-        real_hours = row["real_hours"]
-        hours_formatted = (
-            f"{int(real_hours):02d}:{int((real_hours % 1) * 60):02d}:00"
-            if real_hours > 0
-            else "00:00:00"
-        )
+@st.fragment
+def _advanced_tab(digest, tables, cube):
+    """Visualização: métricas avançadas."""
+    import plotly.express as px
 
-        # Dados da linha
-        excel_data = {
-            "Estória": row.get("story.number", ""),
-            "Número": row.get("number", ""),
-            "Descrição resumida": row.get("short_description", ""),
-            "Estado": row.get("state", ""),
-            "Atribuído a": row.get("assigned_to", ""),
-            "Horas reais": hours_formatted,
-            "Sprint conclusão": row.get("story.sprint", ""),
-        }
+    relatorio = _cached_report(digest, "hours", cube)
 
-        excel_rows.append(excel_data)
+    st.subheader("Métricas Avançadas")
 
-    # Criar DataFrame final
-    excel_df = pd.DataFrame(excel_rows)
+    # Colunas para métricas gerais
+    col1, col2, col3 = st.columns(3)
 
-    # Ordenar por Sprint, Estória e Número
-    excel_df = excel_df.sort_values(
-        ["Sprint conclusão", "Estória", "Número"]
-    ).reset_index(drop=True)
+    with col1:
+        # Média de precisão de estimativas
+        avg_accuracy = relatorio["estimation_accuracy"].mean()
+        st.metric(
+            "Média de Precisão de Estimativas",
+            f"{avg_accuracy:.1f}%",
+            delta=(f"{avg_accuracy - 80:.1f}%" if avg_accuracy != 80 else None),
+            delta_color="normal",
+        )
 
-    return excel_df, tasks_with_real_hours, len(df_concluidas)
+    with col2:
+        # Proporção de tarefas concluídas
+        tasks_done = tables.tasks["is_done"].sum()
+        total_tasks = len(tables.tasks)
+        pct_done = (tasks_done / total_tasks) * 100 if total_tasks > 0 else 0
+        st.metric(
+            "Tarefas Concluídas",
+            f"{pct_done:.1f}%",
+            f"{tasks_done} de {total_tasks}",
+        )
 
+    with col3:
+        # Diferença total entre planejado e real
+        total_planned = relatorio["total_planned_hours"].sum()
+        total_real = relatorio["total_real_hours"].sum()
+        diff = total_real - total_planned
+        st.metric(
+            "Diferença Total (Real - Planejado)",
+            f"{diff:.2f} h",
+            delta=f"{diff:.2f} h",
+            delta_color="inverse",
+        )
 
-def main():
-    """Interface Streamlit para o relatório de horas."""
-    st.set_page_config(page_title="Relatório de Horas", layout="wide")
+    # Carga diária de trabalho
+    st.subheader("Carga Diária de Trabalho")
+    daily_workload = _cached_report(digest, "daily_workload", tables)
+
+    if daily_workload is not None:
+        # Formatar datas para exibição
+        daily_workload["date_str"] = daily_workload["date"].dt.strftime("%d/%m/%Y")
+
+        # Gráfico de linha para carga diária
+        fig = px.line(
+            daily_workload,
+            x="date",
+            y=["planned_hours", "real_hours"],
+            markers=True,
+            labels={"date": "Data", "value": "Horas", "variable": "Tipo"},
+            title="Distribuição da Carga de Trabalho Diária",
+        )
+        fig.update_layout(xaxis_title="Data")
+        st.plotly_chart(fig, use_container_width=True)
+    else:
+        st.info(
+            "Não foi possível calcular a carga diária de trabalho. Verifique se o arquivo CSV contém as datas de início e fim da sprint."
+        )
 
-    st.title("Relatório de Horas por Usuário")
-    st.markdown(
-        """
-        Faça o upload do arquivo CSV exportado do Redmine para visualizar o relatório 
-        de horas planejadas x reais por usuário.
-    """
+    # Top contribuidores
+    st.subheader("Top Contribuidores")
+    top_contributors = relatorio.sort_values("total_real_hours", ascending=False).head(
+        5
     )
 
-    # Upload do arquivo
-    uploaded_file = st.file_uploader("Escolha o arquivo CSV", type=["csv"])
+    if not top_contributors.empty:
+        fig = px.bar(
+            top_contributors,
+            x="assigned_to",
+            y="total_real_hours",
+            labels={
+                "assigned_to": "Usuário",
+                "total_real_hours": "Horas Reais",
+            },
+            title="Top 5 Contribuidores",
+            color="total_real_hours",
+            color_continuous_scale="Viridis",
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+
+@st.fragment
+def _explorer_tab(digest, tables, cube):
+    """Visualização: explorador de tarefas."""
+    import plotly.express as px
+    import plotly.graph_objects as go
+
+    st.subheader("Explorador de Tarefas")
+
+    # Usar uma coluna para organizar o layout (filtros à esquerda, conteúdo à direita)
+    filter_col, content_col = st.columns([1, 3])
+
+    with filter_col:
+        st.markdown("### Filtros")
+
+        # Índice de filtros (opções ordenadas e posições das linhas),
+        # montado uma vez por arquivo
+        filter_index = _cached_report(digest, "filter_index", tables)
+        status_options = ["Todos"] + filter_index.options["state"]
+        epic_options = ["Todos"] + filter_index.options["story.epic"]
+        person_options = ["Todos"] + filter_index.options["assigned_to"]
+        sprint_options = ["Todos"] + filter_index.options["story.sprint"]
+
+        # Adicionar os filtros
+        selected_status = st.selectbox("Status", status_options)
+        selected_epic = st.selectbox("Epic", epic_options)
+        selected_person = st.selectbox("Pessoa", person_options)
+        selected_sprint = st.selectbox("Sprint", sprint_options)
+
+        # Filtrar por range de horas planejadas
+        max_planned = float(tables.tasks["planned_hours"].max())
+        planned_range = st.slider(
+            "Horas Planejadas",
+            0.0,
+            (max_planned if pd.notna(max_planned) and max_planned > 0 else 100.0),
+            (
+                0.0,
+                (max_planned if pd.notna(max_planned) and max_planned > 0 else 100.0),
+            ),
+        )
 
-    if uploaded_file is not None:
-        try:
-            # Lê o arquivo CSV
-            df_original = pd.read_csv(uploaded_file, encoding="latin1")
-            # Reset do cursor para reutilizar o arquivo
-            uploaded_file.seek(0)
+    # Aplicar filtros pelo índice: interseção das posições de cada
+    # filtro, sem copiar o DataFrame inteiro
+    filters = {
+        dimension: value
+        for dimension, value in [
+            ("state", selected_status),
+            ("story.epic", selected_epic),
+            ("assigned_to", selected_person),
+            ("story.sprint", selected_sprint),
+        ]
+        if value != "Todos"
+    }
+    selection = _cached_selection(
+        digest,
+        tuple(filters.items()),
+        tuple(planned_range),
+        tables.tasks,
+        filter_index,
+        cube,
+    )
+    task_count = selection.task_count
+    completed_tasks = selection.completed_tasks
+    missing_estimates = selection.missing_estimates
 
-            # Processar o arquivo para o relatório por usuário
-            relatorio = summarize_hours(uploaded_file)
+    with content_col:
+        # Exibir métricas interessantes baseadas na filtragem
+        metrics_col1, metrics_col2, metrics_col3 = st.columns(3)
 
-            # Preparar dados para o explorador de tarefas
-            df_tasks = prepare_tasks_data(df_original)
+        with metrics_col1:
+            st.metric("Total de Tarefas", task_count)
 
-            # Criar abas para diferentes visualizações
-            tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(
-                [
-                    "Horas por Usuário",
-                    "Status das Tarefas",
-                    "Análise por Epic",
-                    "Análise por Sprint",
-                    "Métricas Avançadas",
-                    "Explorador de Tarefas",
-                ]
+        with metrics_col2:
+            completion_rate = (
+                (completed_tasks / task_count * 100) if task_count > 0 else 0
+            )
+            st.metric(
+                "Taxa de Conclusão",
+                f"{completion_rate:.1f}%",
+                f"{completed_tasks} de {task_count}",
             )
 
-            # Tab 1: Relatório de Horas por Usuário
-            with tab1:
-                st.subheader("Relatório de Horas (Tarefas Concluídas)")
-
-                # Formatação para exibição
-                df_display = relatorio.copy()
-                df_display["total_planned_hours"] = df_display[
-                    "total_planned_hours"
-                ].map("{:.2f} h".format)
-                df_display["total_real_hours"] = df_display["total_real_hours"].map(
-                    "{:.2f} h".format
-                )
-                df_display["difference"] = df_display["difference"].map(
-                    "{:.2f} h".format
-                )
-                df_display["estimation_accuracy"] = df_display[
-                    "estimation_accuracy"
-                ].map("{:.1f}%".format)
-
-                df_display = df_display.rename(
-                    columns={
-                        "assigned_to": "Usuário",
-                        "total_planned_hours": "Horas Planejadas",
-                        "total_real_hours": "Horas Reais",
-                        "difference": "Diferença (Real - Planejada)",
-                        "estimation_accuracy": "Precisão da Estimativa",
-                    }
-                )
-
-                st.dataframe(df_display, use_container_width=True)
-
-                # Gráfico de barras comparativo
-                st.subheader("Gráfico Comparativo")
-
-                fig = px.bar(
-                    relatorio,
-                    x="assigned_to",
-                    y=["total_planned_hours", "total_real_hours"],
-                    barmode="group",
-                    labels={
-                        "assigned_to": "Usuário",
-                        "total_planned_hours": "Horas Planejadas",
-                        "total_real_hours": "Horas Reais",
-                        "value": "Horas",
-                    },
-                    title="Comparação entre Horas Planejadas e Reais por Usuário",
-                    color_discrete_sequence=["#1f77b4", "#ff7f0e"],
-                )
-                st.plotly_chart(fig, use_container_width=True)
-
-                # Gráfico de precisão da estimativa
-                st.subheader("Precisão da Estimativa por Usuário")
-                fig = px.bar(
-                    relatorio,
-                    x="assigned_to",
-                    y="estimation_accuracy",
-                    labels={
-                        "assigned_to": "Usuário",
-                        "estimation_accuracy": "Precisão da Estimativa (%)",
-                    },
-                    title="Precisão da Estimativa por Usuário",
-                    color="estimation_accuracy",
-                    color_continuous_scale="RdYlGn",
-                    range_color=[0, 100],
-                )
-                st.plotly_chart(fig, use_container_width=True)
-
-            # Tab 2: Status das Tarefas
-            with tab2:
-                st.subheader("Distribuição de Status das Tarefas")
-
-                # Gerar resumo de status
-                status_summary = get_task_status_summary(df_original)
-
-                # Gráfico de pizza para status
-                fig = px.pie(
-                    status_summary,
-                    values="Quantidade",
-                    names="Status",
-                    title="Distribuição de Tarefas por Status",
-                )
-                st.plotly_chart(fig, use_container_width=True)
-
-                # Tabela de status
-                st.dataframe(status_summary, use_container_width=True)
-
-                # Número de tarefas por usuário
-                st.subheader("Tarefas por Usuário")
-                tasks_by_user = df_original["assigned_to"].value_counts().reset_index()
-                tasks_by_user.columns = ["Usuário", "Número de Tarefas"]
-
-                fig = px.bar(
-                    tasks_by_user,
-                    x="Usuário",
-                    y="Número de Tarefas",
-                    title="Quantidade de Tarefas por Usuário",
-                )
-                st.plotly_chart(fig, use_container_width=True)
-
-            # Tab 3: Análise por Epic
-            with tab3:
-                st.subheader("Análise por Epic")
-
-                # Gerar resumo por epic
-                epic_summary = get_epic_summary(df_original)
-
-                # Formatar para exibição
-                epic_display = epic_summary.copy()
-                epic_display["total_planned_hours"] = epic_display[
-                    "total_planned_hours"
-                ].map("{:.2f} h".format)
-                epic_display["total_real_hours"] = epic_display["total_real_hours"].map(
-                    "{:.2f} h".format
-                )
-                epic_display["difference"] = epic_display["difference"].map(
-                    "{:.2f} h".format
-                )
-                epic_display["pct_completed"] = epic_display["pct_completed"].map(
-                    "{:.1f}%".format
-                )
+        with metrics_col3:
+            missing_rate = (
+                (missing_estimates / task_count * 100) if task_count > 0 else 0
+            )
+            st.metric(
+                "Tarefas sem Estimativa",
+                f"{missing_rate:.1f}%",
+                f"{missing_estimates} de {task_count}",
+                delta_color="inverse",
+            )
 
-                epic_display = epic_display.rename(
-                    columns={
-                        "story.epic": "Epic",
-                        "num_tasks": "Número de Tarefas",
-                        "total_planned_hours": "Horas Planejadas",
-                        "total_real_hours": "Horas Reais",
-                        "difference": "Diferença (Real - Planejada)",
-                        "pct_completed": "% Concluído",
-                    }
-                )
+        # Gráficos específicos para a visualização filtrada
+        if len(selection.rows) > 0:
+            # Gráfico de Eficiência para tarefas concluídas
+            completed_tasks_df = tables.tasks.take(selection.completed_rows)
 
-                st.dataframe(epic_display, use_container_width=True)
+            if len(completed_tasks_df) > 0:
+                efficiency_col1, efficiency_col2 = st.columns(2)
 
-                # Gráfico de progresso por epic
-                if not epic_summary.empty:
-                    fig = px.bar(
-                        epic_summary.sort_values("pct_completed"),
-                        x="pct_completed",
-                        y="story.epic",
-                        orientation="h",
-                        labels={"story.epic": "Epic", "pct_completed": "% Concluído"},
-                        title="Progresso por Epic (%)",
-                        color="pct_completed",
-                        color_continuous_scale="Blues",
-                        range_color=[0, 100],
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
+                with efficiency_col1:
+                    st.subheader("Eficiência por Tarefa (Concluídas)")
 
-                    # Gráfico de horas por epic
-                    fig = px.bar(
-                        epic_summary,
-                        x="story.epic",
-                        y=["total_planned_hours", "total_real_hours"],
-                        barmode="group",
+                    fig = px.scatter(
+                        completed_tasks_df,
+                        x="planned_hours",
+                        y="real_hours",
+                        color="efficiency",
+                        hover_name="short_description",
+                        color_continuous_scale="RdYlGn_r",
                         labels={
-                            "story.epic": "Epic",
-                            "total_planned_hours": "Horas Planejadas",
-                            "total_real_hours": "Horas Reais",
-                            "value": "Horas",
+                            "planned_hours": "Horas Planejadas",
+                            "real_hours": "Horas Reais",
+                            "efficiency": "Eficiência",
                         },
-                        title="Horas Planejadas vs. Reais por Epic",
-                        color_discrete_sequence=["#1f77b4", "#ff7f0e"],
+                        title="Relação entre Horas Planejadas e Reais",
                     )
-                    st.plotly_chart(fig, use_container_width=True)
-
-            # Tab 4: Análise por Sprint
-            with tab4:
-                st.subheader("Análise por Sprint")
-
-                # Gerar resumo por sprint
-                sprint_summary = get_sprint_summary(df_original)
-
-                # Formatar para exibição
-                sprint_display = sprint_summary.copy()
-                sprint_display["total_planned_hours"] = sprint_display[
-                    "total_planned_hours"
-                ].map("{:.2f} h".format)
-                sprint_display["total_real_hours"] = sprint_display[
-                    "total_real_hours"
-                ].map("{:.2f} h".format)
-                sprint_display["difference"] = sprint_display["difference"].map(
-                    "{:.2f} h".format
-                )
-                sprint_display["pct_completed"] = sprint_display["pct_completed"].map(
-                    "{:.1f}%".format
-                )
-
-                sprint_display = sprint_display.rename(
-                    columns={
-                        "story.sprint": "Sprint",
-                        "num_tasks": "Número de Tarefas",
-                        "total_planned_hours": "Horas Planejadas",
-                        "total_real_hours": "Horas Reais",
-                        "difference": "Diferença (Real - Planejada)",
-                        "pct_completed": "% Concluído",
-                    }
-                )
-
-                st.dataframe(sprint_display, use_container_width=True)
 
-                # Gráfico de velocidade da sprint
-                if not sprint_summary.empty:
-                    fig = px.line(
-                        sprint_summary,
-                        x="story.sprint",
-                        y=["total_planned_hours", "total_real_hours"],
-                        markers=True,
-                        labels={
-                            "story.sprint": "Sprint",
-                            "value": "Horas",
-                            "variable": "Tipo",
-                        },
-                        title="Velocidade da Sprint (Horas Planejadas vs. Reais)",
+                    # Adicionar linha de referência (planejado = real)
+                    max_hours = max(
+                        completed_tasks_df["planned_hours"].max(),
+                        completed_tasks_df["real_hours"].max(),
                     )
-                    fig.update_layout(
-                        legend=dict(
-                            orientation="h",
-                            yanchor="bottom",
-                            y=1.02,
-                            xanchor="right",
-                            x=1,
+                    fig.add_trace(
+                        go.Scatter(
+                            x=[0, max_hours],
+                            y=[0, max_hours],
+                            mode="lines",
+                            line=dict(color="gray", dash="dash"),
+                            name="Ideal (Planejado = Real)",
                         )
                     )
-                    st.plotly_chart(fig, use_container_width=True)
 
-                    # Gráfico de % completado por sprint
-                    fig = px.bar(
-                        sprint_summary,
-                        x="story.sprint",
-                        y="pct_completed",
-                        labels={
-                            "story.sprint": "Sprint",
-                            "pct_completed": "% Concluído",
-                        },
-                        title="Percentual de Conclusão por Sprint",
-                        color="pct_completed",
-                        color_continuous_scale="Greens",
-                        range_color=[0, 100],
-                    )
                     st.plotly_chart(fig, use_container_width=True)
 
-            # Tab 5: Métricas Avançadas
-            with tab5:
-                st.subheader("Métricas Avançadas")
-
-                # Colunas para métricas gerais
-                col1, col2, col3 = st.columns(3)
-
-                with col1:
-                    # Média de precisão de estimativas
-                    avg_accuracy = relatorio["estimation_accuracy"].mean()
-                    st.metric(
-                        "Média de Precisão de Estimativas",
-                        f"{avg_accuracy:.1f}%",
-                        delta=(
-                            f"{avg_accuracy - 80:.1f}%" if avg_accuracy != 80 else None
-                        ),
-                        delta_color="normal",
-                    )
-
-                with col2:
-                    # Proporção de tarefas concluídas
-                    tasks_done = (df_original["state"].str.lower() == "concluído").sum()
-                    total_tasks = len(df_original)
-                    pct_done = (
-                        (tasks_done / total_tasks) * 100 if total_tasks > 0 else 0
-                    )
-                    st.metric(
-                        "Tarefas Concluídas",
-                        f"{pct_done:.1f}%",
-                        f"{tasks_done} de {total_tasks}",
-                    )
-
-                with col3:
-                    # Diferença total entre planejado e real
-                    total_planned = relatorio["total_planned_hours"].sum()
-                    total_real = relatorio["total_real_hours"].sum()
-                    diff = total_real - total_planned
-                    st.metric(
-                        "Diferença Total (Real - Planejado)",
-                        f"{diff:.2f} h",
-                        delta=f"{diff:.2f} h",
-                        delta_color="inverse",
-                    )
-
-                # Carga diária de trabalho
-                st.subheader("Carga Diária de Trabalho")
-                daily_workload = get_daily_workload(df_original)
+                with efficiency_col2:
+                    st.subheader("Distribuição da Eficiência")
 
-                if daily_workload is not None:
-                    # Formatar datas para exibição
-                    daily_workload["date_str"] = daily_workload["date"].dt.strftime(
-                        "%d/%m/%Y"
-                    )
+                    # Contagem por faixa de eficiência, já na ordem
+                    # das categorias
+                    efficiency_counts = selection.efficiency_counts
 
-                    # Gráfico de linha para carga diária
-                    fig = px.line(
-                        daily_workload,
-                        x="date",
-                        y=["planned_hours", "real_hours"],
-                        markers=True,
-                        labels={"date": "Data", "value": "Horas", "variable": "Tipo"},
-                        title="Distribuição da Carga de Trabalho Diária",
-                    )
-                    fig.update_layout(xaxis_title="Data")
-                    st.plotly_chart(fig, use_container_width=True)
-                else:
-                    st.info(
-                        "Não foi possível calcular a carga diária de trabalho. Verifique se o arquivo CSV contém as datas de início e fim da sprint."
-                    )
-
-                # Top contribuidores
-                st.subheader("Top Contribuidores")
-                top_contributors = relatorio.sort_values(
-                    "total_real_hours", ascending=False
-                ).head(5)
-
-                if not top_contributors.empty:
                     fig = px.bar(
-                        top_contributors,
-                        x="assigned_to",
-                        y="total_real_hours",
-                        labels={
-                            "assigned_to": "Usuário",
-                            "total_real_hours": "Horas Reais",
+                        efficiency_counts,
+                        x="Categoria",
+                        y="Quantidade",
+                        title="Distribuição da Eficiência das Estimativas",
+                        color="Categoria",
+                        color_discrete_map={
+                            "Sem estimativa": "#808080",
+                            "Muito abaixo (>200%)": "#d62728",
+                            "Abaixo (125-200%)": "#ff7f0e",
+                            "Adequada (80-125%)": "#2ca02c",
+                            "Acima (50-80%)": "#ff7f0e",
+                            "Muito acima (<50%)": "#d62728",
                         },
-                        title="Top 5 Contribuidores",
-                        color="total_real_hours",
-                        color_continuous_scale="Viridis",
                     )
+
                     st.plotly_chart(fig, use_container_width=True)
 
-            # Tab 6: Explorador de Tarefas
-            with tab6:
-                st.subheader("Explorador de Tarefas")
+        # Tabela com as tarefas filtradas, paginada: só as linhas da página
+        # atual são montadas e enviadas ao navegador
+        st.subheader("Lista de Tarefas")
+
+        n_pages = max(1, -(-len(selection.rows) // TASK_PAGE_SIZE))
+        page = st.number_input("Página", min_value=1, max_value=n_pages, value=1)
+        page_rows = selection.rows[(page - 1) * TASK_PAGE_SIZE : page * TASK_PAGE_SIZE]
+
+        # Verificar se as colunas existem; rótulos e formatação numérica são
+        # aplicados na exibição, sem copiar as colunas
+        display_columns = [col for col in TASK_LIST_COLUMNS if col in tables.columns]
+        column_config = {
+            col: (
+                st.column_config.NumberColumn(label, format="%.2f")
+                if col in ("planned_hours", "real_hours", "difference")
+                else label
+            )
+            for col, label in TASK_LIST_COLUMNS.items()
+        }
 
-                # Usar uma coluna para organizar o layout (filtros à esquerda, conteúdo à direita)
-                filter_col, content_col = st.columns([1, 3])
+        # Exibir tabela
+        st.dataframe(
+            tables.take(page_rows, display_columns),
+            column_config=column_config,
+            use_container_width=True,
+        )
+        st.caption(f"Página {page} de {n_pages} ({len(selection.rows)} tarefas)")
+
+        # Download das tarefas filtradas como CSV, gerado apenas quando
+        # solicitado
+        if len(selection.rows) > 0:
+            _lazy_download(
+                digest,
+                ("filtered_csv", tuple(filters.items()), tuple(planned_range)),
+                lambda: tables.take(selection.rows).to_csv(index=False).encode("utf-8"),
+                "⚙️ Gerar CSV das tarefas filtradas",
+                label="Baixar tarefas filtradas como CSV",
+                file_name="tarefas_filtradas.csv",
+                mime="text/csv",
+            )
 
-                with filter_col:
-                    st.markdown("### Filtros")
 
-                    # Preparar opções para filtros
-                    status_options = ["Todos"] + sorted(
-                        [x for x in df_tasks["state"].unique() if x != ""]
-                    )
-                    epic_options = ["Todos"] + sorted(
-                        [epic for epic in df_tasks["story.epic"].unique() if epic != ""]
-                    )
-                    person_options = ["Todos"] + sorted(
-                        [x for x in df_tasks["assigned_to"].unique() if x != ""]
-                    )
-                    sprint_options = ["Todos"] + sorted(
-                        [x for x in df_tasks["story.sprint"].unique() if x != ""]
-                    )
+@st.fragment
+def _export_section(digest, cube, tables):
+    """Exportação do relatório resumo e do Excel de tarefas concluídas."""
+    relatorio = _cached_report(digest, "hours", cube)
 
-                    # Adicionar os filtros
-                    selected_status = st.selectbox("Status", status_options)
-                    selected_epic = st.selectbox("Epic", epic_options)
-                    selected_person = st.selectbox("Pessoa", person_options)
-                    selected_sprint = st.selectbox("Sprint", sprint_options)
-
-                    # Filtrar por range de horas planejadas
-                    max_planned = float(df_tasks["planned_hours"].max())
-                    planned_range = st.slider(
-                        "Horas Planejadas",
-                        0.0,
-                        (
-                            max_planned
-                            if pd.notna(max_planned) and max_planned > 0
-                            else 100.0
-                        ),
-                        (
-                            0.0,
-                            (
-                                max_planned
-                                if pd.notna(max_planned) and max_planned > 0
-                                else 100.0
-                            ),
-                        ),
-                    )
+    st.markdown("---")
+    st.subheader("Exportar Dados")
 
-                # Aplicar filtros
-                filtered_df = df_tasks.copy()
-
-                if selected_status != "Todos":
-                    filtered_df = filtered_df[filtered_df["state"] == selected_status]
-
-                if selected_epic != "Todos":
-                    filtered_df = filtered_df[
-                        filtered_df["story.epic"] == selected_epic
-                    ]
-
-                if selected_person != "Todos":
-                    filtered_df = filtered_df[
-                        filtered_df["assigned_to"] == selected_person
-                    ]
-
-                if selected_sprint != "Todos":
-                    filtered_df = filtered_df[
-                        filtered_df["story.sprint"] == selected_sprint
-                    ]
-
-                filtered_df = filtered_df[
-                    (filtered_df["planned_hours"] >= planned_range[0])
-                    & (filtered_df["planned_hours"] <= planned_range[1])
-                ]
-
-                with content_col:
-                    # Exibir métricas interessantes baseadas na filtragem
-                    metrics_col1, metrics_col2, metrics_col3 = st.columns(3)
-
-                    with metrics_col1:
-                        task_count = len(filtered_df)
-                        st.metric("Total de Tarefas", task_count)
-
-                    with metrics_col2:
-                        completed_tasks = filtered_df[
-                            filtered_df["state"].str.lower() == "concluído"
-                        ].shape[0]
-                        completion_rate = (
-                            (completed_tasks / task_count * 100)
-                            if task_count > 0
-                            else 0
-                        )
-                        st.metric(
-                            "Taxa de Conclusão",
-                            f"{completion_rate:.1f}%",
-                            f"{completed_tasks} de {task_count}",
-                        )
+    col1, col2 = st.columns(2)
 
-                    with metrics_col3:
-                        missing_estimates = filtered_df[
-                            filtered_df["planned_hours"] == 0
-                        ].shape[0]
-                        missing_rate = (
-                            (missing_estimates / task_count * 100)
-                            if task_count > 0
-                            else 0
-                        )
-                        st.metric(
-                            "Tarefas sem Estimativa",
-                            f"{missing_rate:.1f}%",
-                            f"{missing_estimates} de {task_count}",
-                            delta_color="inverse",
-                        )
+    with col1:
+        # Download do relatório como CSV
+        _lazy_download(
+            digest,
+            ("relatorio_csv",),
+            lambda: relatorio.to_csv(index=False).encode("utf-8"),
+            "⚙️ Gerar Relatório Resumo (CSV)",
+            label="📄 Baixar Relatório Resumo (CSV)",
+            file_name="relatorio_horas.csv",
+            mime="text/csv",
+        )
 
-                    # Gráficos específicos para a visualização filtrada
-                    if len(filtered_df) > 0:
-                        # Gráfico de Eficiência para tarefas concluídas
-                        completed_tasks_df = filtered_df[
-                            filtered_df["state"].str.lower() == "concluído"
-                        ].copy()
-                        completed_tasks_df = completed_tasks_df[
-                            completed_tasks_df["planned_hours"] > 0
-                        ]
-
-                        if len(completed_tasks_df) > 0:
-                            efficiency_col1, efficiency_col2 = st.columns(2)
-
-                            with efficiency_col1:
-                                st.subheader("Eficiência por Tarefa (Concluídas)")
-
-                                fig = px.scatter(
-                                    completed_tasks_df,
-                                    x="planned_hours",
-                                    y="real_hours",
-                                    color="efficiency",
-                                    hover_name="short_description",
-                                    color_continuous_scale="RdYlGn_r",
-                                    labels={
-                                        "planned_hours": "Horas Planejadas",
-                                        "real_hours": "Horas Reais",
-                                        "efficiency": "Eficiência",
-                                    },
-                                    title="Relação entre Horas Planejadas e Reais",
-                                )
-
-                                # Adicionar linha de referência (planejado = real)
-                                max_hours = max(
-                                    completed_tasks_df["planned_hours"].max(),
-                                    completed_tasks_df["real_hours"].max(),
-                                )
-                                fig.add_trace(
-                                    go.Scatter(
-                                        x=[0, max_hours],
-                                        y=[0, max_hours],
-                                        mode="lines",
-                                        line=dict(color="gray", dash="dash"),
-                                        name="Ideal (Planejado = Real)",
-                                    )
-                                )
-
-                                st.plotly_chart(fig, use_container_width=True)
-
-                            with efficiency_col2:
-                                st.subheader("Distribuição da Eficiência")
-
-                                # Categorizar eficiência
-                                def categorize_efficiency(eff):
-                                    if eff == 0:
-                                        return "Sem estimativa"
-                                    elif eff < 0.5:
-                                        return "Muito abaixo (>200%)"
-                                    elif eff < 0.8:
-                                        return "Abaixo (125-200%)"
-                                    elif eff < 1.25:
-                                        return "Adequada (80-125%)"
-                                    elif eff < 2:
-                                        return "Acima (50-80%)"
-                                    else:
-                                        return "Muito acima (<50%)"
-
-                                completed_tasks_df["efficiency_category"] = (
-                                    completed_tasks_df["efficiency"].apply(
-                                        categorize_efficiency
-                                    )
-                                )
-
-                                category_order = [
-                                    "Sem estimativa",
-                                    "Muito abaixo (>200%)",
-                                    "Abaixo (125-200%)",
-                                    "Adequada (80-125%)",
-                                    "Acima (50-80%)",
-                                    "Muito acima (<50%)",
-                                ]
-
-                                # Count por categoria
-                                efficiency_counts = (
-                                    completed_tasks_df["efficiency_category"]
-                                    .value_counts()
-                                    .reset_index()
-                                )
-                                efficiency_counts.columns = ["Categoria", "Quantidade"]
-
-                                # Reordenar categorias
-                                efficiency_counts["Categoria"] = pd.Categorical(
-                                    efficiency_counts["Categoria"],
-                                    categories=category_order,
-                                    ordered=True,
-                                )
-                                efficiency_counts = efficiency_counts.sort_values(
-                                    "Categoria"
-                                )
-
-                                fig = px.bar(
-                                    efficiency_counts,
-                                    x="Categoria",
-                                    y="Quantidade",
-                                    title="Distribuição da Eficiência das Estimativas",
-                                    color="Categoria",
-                                    color_discrete_map={
-                                        "Sem estimativa": "#808080",
-                                        "Muito abaixo (>200%)": "#d62728",
-                                        "Abaixo (125-200%)": "#ff7f0e",
-                                        "Adequada (80-125%)": "#2ca02c",
-                                        "Acima (50-80%)": "#ff7f0e",
-                                        "Muito acima (<50%)": "#d62728",
-                                    },
-                                )
-
-                                st.plotly_chart(fig, use_container_width=True)
-
-                    # Tabela completa com todas as tarefas filtradas
-                    st.subheader("Lista de Tarefas")
-
-                    # Colunas a serem exibidas
-                    display_columns = [
-                        "number",
-                        "short_description",
-                        "story.sprint",
-                        "story.epic",
-                        "assigned_to",
-                        "state",
-                        "planned_hours",
-                        "real_hours",
-                        "difference",
-                    ]
-
-                    # Verificar se as colunas existem e criar um DataFrame para exibição
-                    display_columns = [
-                        col for col in display_columns if col in filtered_df.columns
-                    ]
-                    display_df = filtered_df[display_columns].copy()
-
-                    # Renomear colunas para exibição
-                    column_names = {
-                        "number": "Número",
-                        "short_description": "Descrição",
-                        "story.sprint": "Sprint",
-                        "story.epic": "Epic",
-                        "assigned_to": "Responsável",
-                        "state": "Status",
-                        "planned_hours": "Horas Planejadas",
-                        "real_hours": "Horas Reais",
-                        "difference": "Diferença",
-                    }
-
-                    # Aplicar renomeação apenas para colunas que existem
-                    rename_cols = {
-                        k: v for k, v in column_names.items() if k in display_df.columns
-                    }
-                    display_df = display_df.rename(columns=rename_cols)
-
-                    # Formatar colunas numéricas
-                    for col in ["Horas Planejadas", "Horas Reais", "Diferença"]:
-                        if col in display_df.columns:
-                            display_df[col] = display_df[col].map("{:.2f}".format)
-
-                    # Exibir tabela
-                    st.dataframe(display_df, use_container_width=True)
-
-                    # Download das tarefas filtradas como CSV
-                    if not filtered_df.empty:
-                        filtered_csv = filtered_df.to_csv(index=False).encode("utf-8")
-                        st.download_button(
-                            label="Baixar tarefas filtradas como CSV",
-                            data=filtered_csv,
-                            file_name="tarefas_filtradas.csv",
-                            mime="text/csv",
-                        )
+    with col2:
+        # Campo para definir mês de referência - removido pois não é mais necessário
+        pass
 
-            # Seção de Exportação (após todas as abas)
-            st.markdown("---")
-            st.subheader("Exportar Dados")
+    # Seção dedicada para Excel
+    st.markdown("### 📊 Exportação para Excel")
+    st.info(
+        "Exporta apenas as **tarefas concluídas** em formato Excel com as colunas: Estória, Número, Descrição resumida, Estado, Atribuído a, Horas reais, Sprint conclusão"
+    )
 
-            col1, col2 = st.columns(2)
+    # Preparar as linhas do Excel; o arquivo só é gerado sob demanda
+    try:
+        # Converter para formato Excel
+        excel_df, tasks_with_real_hours, total_completed_tasks = _cached_report(
+            digest, "excel", tables
+        )
 
-            with col1:
-                # Download do relatório como CSV
-                csv_export = relatorio.to_csv(index=False).encode("utf-8")
-                st.download_button(
-                    label="📄 Baixar Relatório Resumo (CSV)",
-                    data=csv_export,
-                    file_name="relatorio_horas.csv",
-                    mime="text/csv",
-                )
+        # Colunas para informações e download
+        info_col, download_col = st.columns([2, 1])
 
-            with col2:
-                # Campo para definir mês de referência - removido pois não é mais necessário
-                pass
+        with info_col:
+            st.success(
+                f"✅ Arquivo Excel preparado com {len(excel_df)} tarefas concluídas"
+            )
 
-            # Seção dedicada para Excel
-            st.markdown("### 📊 Exportação para Excel")
+            # Informações sobre processamento de dados
+            total_tasks_original = len(tables.tasks)
             st.info(
-                "Exporta apenas as **tarefas concluídas** em formato Excel com as colunas: Estória, Número, Descrição resumida, Estado, Atribuído a, Horas reais, Sprint conclusão"
+                f"📋 {total_completed_tasks} de {total_tasks_original} tarefas estão concluídas ({total_completed_tasks/total_tasks_original*100:.1f}%)"
             )
 
-            # Gerar dados Excel automaticamente quando houver dados
-            try:
-                # Converter para formato Excel
-                excel_df, tasks_with_real_hours, total_completed_tasks = (
-                    export_to_excel_format(df_original)
+            if tasks_with_real_hours > 0:
+                st.info(
+                    f"⏱️ {tasks_with_real_hours} de {total_completed_tasks} tarefas concluídas têm horas reais > 0"
                 )
 
-                # Criar arquivo Excel em memória
-                from io import BytesIO
+        with download_col:
+            # O arquivo é serializado apenas quando solicitado e depois
+            # servido do cache enquanto o conteúdo do CSV for o mesmo
+            _lazy_download(
+                digest,
+                ("excel",),
+                lambda: build_excel_file(excel_df),
+                "⚙️ Gerar Excel",
+                use_container_width=True,
+                label="📥 Baixar Excel",
+                file_name=f"tarefas_concluidas_{datetime.datetime.now().strftime('%Y_%m_%d')}.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            )
 
-                excel_buffer = BytesIO()
-                with pd.ExcelWriter(excel_buffer, engine="openpyxl") as writer:
-                    # Aba com dados detalhados
-                    excel_df.to_excel(
-                        writer, sheet_name="Tarefas Concluídas", index=False
-                    )
+        # Preview dos dados Excel (opcional)
+        with st.expander("👁️ Preview dos dados Excel (primeiras 10 linhas)"):
+            st.dataframe(excel_df.head(10), use_container_width=True)
 
-                excel_buffer.seek(0)
+    except Exception as e:
+        st.error(f"❌ Erro ao gerar arquivo Excel: {str(e)}")
+        st.error(
+            "Verifique se todos os dados necessários estão presentes no arquivo CSV."
+        )
+        # Debug info
+        with st.expander("🔍 Informações de Debug"):
+            st.write("Colunas disponíveis no DataFrame:")
+            st.write(tables.columns)
+            st.write("Primeiras 3 linhas do DataFrame original:")
+            st.write(tables.take(np.arange(min(3, len(tables.tasks)))))
 
-                # Colunas para informações e download
-                info_col, download_col = st.columns([2, 1])
 
-                with info_col:
-                    st.success(
-                        f"✅ Arquivo Excel preparado com {len(excel_df)} tarefas concluídas"
-                    )
+def main():
+    """Interface Streamlit para o relatório de horas."""
+    st.set_page_config(page_title="Relatório de Horas", layout="wide")
 
-                    # Informações sobre processamento de dados
-                    total_tasks_original = len(df_original)
-                    st.info(
-                        f"📋 {total_completed_tasks} de {total_tasks_original} tarefas estão concluídas ({total_completed_tasks/total_tasks_original*100:.1f}%)"
-                    )
+    st.title("Relatório de Horas por Usuário")
+    st.markdown(
+        """
+        Faça o upload de um ou mais arquivos CSV exportados do Redmine para visualizar 
+        o relatório de horas planejadas x reais por usuário.
+    """
+    )
 
-                    if tasks_with_real_hours > 0:
-                        st.info(
-                            f"⏱️ {tasks_with_real_hours} de {total_completed_tasks} tarefas concluídas têm horas reais > 0"
-                        )
+    # Upload dos arquivos (ex.: um por mês)
+    uploaded_files = st.file_uploader(
+        "Escolha os arquivos CSV",
+        type=["csv"],
+        accept_multiple_files=True,
+        help="Exportações combinadas: tarefas repetidas ficam com o último arquivo.",
+    )
 
-                with download_col:
-                    # Botão de download sempre disponível
-                    st.download_button(
-                        label="📥 Baixar Excel",
-                        data=excel_buffer.getvalue(),
-                        file_name=f"tarefas_concluidas_{datetime.datetime.now().strftime('%Y_%m_%d')}.xlsx",
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                        use_container_width=True,
-                    )
+    if uploaded_files:
+        try:
+            # Lê e normaliza cada arquivo CSV uma única vez por conteúdo; o
+            # conjunto é identificado pelos hashes dos arquivos, em ordem
+            file_digests = [_file_digest(file) for file in uploaded_files]
+            digest = (
+                file_digests[0]
+                if len(file_digests) == 1
+                else hashlib.sha256("".join(file_digests).encode()).hexdigest()
+            )
+            tables, ingest = _cached_tasks(
+                digest,
+                [
+                    (file_digest, file.getvalue())
+                    for file_digest, file in zip(file_digests, uploaded_files)
+                ],
+            )
+            if len(uploaded_files) > 1:
+                st.caption(
+                    f"{len(uploaded_files)} arquivos combinados: "
+                    f"{len(tables.tasks)} tarefas distintas"
+                )
 
-                # Preview dos dados Excel (opcional)
-                with st.expander("👁️ Preview dos dados Excel (primeiras 10 linhas)"):
-                    st.dataframe(excel_df.head(10), use_container_width=True)
+            # Agregados por pessoa × epic × sprint × status, base dos resumos
+            cube = _cached_report(digest, "cube", tables)
+
+            # Visualizações disponíveis; ao contrário de st.tabs, só a
+            # selecionada é executada (dados e gráficos das demais não são
+            # calculados até serem abertas)
+            views = {
+                "Horas por Usuário": lambda: _hours_tab(digest, cube),
+                "Status das Tarefas": lambda: _status_tab(digest, cube),
+                "Análise por Epic": lambda: _epic_tab(digest, cube),
+                "Análise por Sprint": lambda: _sprint_tab(digest, cube),
+                "Métricas Avançadas": lambda: _advanced_tab(digest, tables, cube),
+                "Explorador de Tarefas": lambda: _explorer_tab(digest, tables, cube),
+            }
+            selected_view = st.segmented_control(
+                "Visualização",
+                list(views),
+                default=next(iter(views)),
+                key="selected_view",
+                label_visibility="collapsed",
+            )
 
-            except Exception as e:
-                st.error(f"❌ Erro ao gerar arquivo Excel: {str(e)}")
-                st.error(
-                    "Verifique se todos os dados necessários estão presentes no arquivo CSV."
+            # Cada visualização é um fragmento: interagir com os widgets dela
+            # reexecuta só a visualização, não o app inteiro
+            views[selected_view or next(iter(views))]()
+
+            # Uso de memória das tabelas compactas de tarefas e histórias
+            with st.expander("🧮 Uso de memória dos dados"):
+                memory = _cached_report(digest, "memory", tables)
+                total = memory.iloc[-1]
+                st.write(
+                    f"{total['after_bytes'] / 1024**2:.1f} MB em memória "
+                    f"(antes: {total['before_bytes'] / 1024**2:.1f} MB, "
+                    f"redução de {total['reduction_pct']:.1f}%)"
+                )
+                st.dataframe(
+                    memory.rename(
+                        columns={
+                            "column": "Coluna",
+                            "before_bytes": "Bytes (antes)",
+                            "after_bytes": "Bytes (compacto)",
+                            "reduction_pct": "Redução (%)",
+                        }
+                    ),
+                    use_container_width=True,
                 )
-                # Debug info
-                with st.expander("🔍 Informações de Debug"):
-                    st.write("Colunas disponíveis no DataFrame:")
-                    st.write(list(df_original.columns))
-                    st.write("Primeiras 3 linhas do DataFrame original:")
-                    st.write(df_original.head(3))
+
+            # Leitor de CSV e tempos da carga de cada arquivo
+            with st.expander("⏱️ Leitura dos arquivos"):
+                st.dataframe(
+                    pd.DataFrame(
+                        {
+                            "Arquivo": [file.name for file in uploaded_files],
+                            "Leitor": [info.get("backend") for info in ingest],
+                            "Leitura (s)": [
+                                info.get("read_seconds") for info in ingest
+                            ],
+                            "Normalização (s)": [
+                                info.get("prepare_seconds") for info in ingest
+                            ],
+                        }
+                    ),
+                    column_config={
+                        "Leitura (s)": st.column_config.NumberColumn(format="%.3f"),
+                        "Normalização (s)": st.column_config.NumberColumn(
+                            format="%.3f"
+                        ),
+                    },
+                    hide_index=True,
+                    use_container_width=True,
+                )
+
+            # Seção de Exportação (após todas as abas); gerar o Excel reexecuta
+            # apenas esta seção
+            _export_section(digest, cube, tables)
 
         except Exception as e:
             st.error(f"Erro ao processar o arquivo: {e}")